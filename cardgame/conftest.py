@@ -0,0 +1,9 @@
+import pytest
+
+from core import catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog():
+    # the card catalog lives as long as the process, card pks are reused between tests
+    catalog.clear()
@@ -0,0 +1,221 @@
+"""Many games at once as NumPy arrays, stepped in lockstep. Mirrors the rules of
+'core.engine.Engine' for random playouts and card balance sweeps."""
+import numpy as np
+
+from core import catalog
+from core.constants import Card, Game, GameCard, Player
+from core.evaluation import SLOT_WEIGHTS, ZONES
+
+DECK_SIZE = 60
+PERSONS_PER_DECK = 20
+
+STATUS_SETUP, STATUS_BUSY, STATUS_DONE = range(len(Game.STATUS_ORDER))
+PHASE_DRAW, PHASE_MAIN, PHASE_DEBATE, PHASE_UPKEEP = range(len(Game.PHASE_ORDER))
+
+ZONE_WEIGHTS = np.array([SLOT_WEIGHTS[zone] for zone in ZONES])
+
+
+def static_eval(health, zone_counts):
+    """Static eval of a batch of positions, see 'core.evaluation.static_eval'. Takes the
+    health per position and player (N, 2) and the zone counts per position, player and zone
+    (N, 2, 4), zones ordered as in ZONES, returns the values (N,)."""
+    health = np.asarray(health)
+    zone_counts = np.asarray(zone_counts)
+    hundredths = 100 * (health[:, 0] - health[:, 1]) + (zone_counts[:, 0] - zone_counts[:, 1]) @ ZONE_WEIGHTS
+    return hundredths / 100
+
+
+class BatchSimulator:
+    """Games are rows of the arrays, players the second axis (player 1 at 0). Cards are
+    indices into 'cards'. Decks are ordered bottom to top, 'deck_size' is the
+    number of cards still on a deck, so its top card is at 'deck_size - 1'.
+
+    Every step plays one move in every unfinished game: drawing in the draw phase, and in
+    the main phase playing a person with chance 'person_chance' if one can be played,
+    otherwise passing. Phases without moves are skipped, like 'Engine.next_phase' does."""
+
+    def __init__(self, cards, games, seed=None, decks=None, max_rounds=30, person_chance=0.5):
+        self.cards = catalog.register(cards)
+        self.rng = np.random.default_rng(seed)
+        self.max_rounds = max_rounds
+        self.person_chance = person_chance
+
+        # card lookups
+        self.is_person = np.array([card.kind == Card.KIND_PERSON for card in self.cards])
+        self.power = np.array([card.power or 0 for card in self.cards])
+        self.endurance = np.array([card.endurance or 0 for card in self.cards])
+        self.support = np.array([card.support for card in self.cards])
+
+        n = len(self.cards)
+        self.games = games
+        self.decks = self.random_decks(games) if decks is None else np.array(decks)
+        self.deck_size = np.full((games, 2), self.decks.shape[2])
+        self.hand = np.zeros((games, 2, n), dtype=np.int16)
+        self.table = np.zeros((games, 2, n), dtype=np.int16)
+        self.grave = np.zeros((games, 2, n), dtype=np.int16)
+
+        self.status = np.full(games, STATUS_SETUP)
+        self.phase = np.full(games, PHASE_DRAW)
+        self.turn = np.ones(games, dtype=np.int8)
+        self.round = np.ones(games, dtype=np.int32)
+        self.health = np.full((games, 2), Player.BELIEVE_START)
+        self.pool = np.zeros((games, 2), dtype=np.int32)
+        self.last_turn_person = np.zeros((games, 2), dtype=np.int32)
+        self.moves = np.zeros(games, dtype=np.int32)
+
+    def random_decks(self, games):
+        """Decks like 'create_random_deck': 20 random persons and 40 random opinions"""
+        persons = np.flatnonzero(self.is_person)
+        opinions = np.flatnonzero(~self.is_person)
+        return np.concatenate([
+            self.rng.choice(persons, (games, 2, PERSONS_PER_DECK)),
+            self.rng.choice(opinions, (games, 2, DECK_SIZE - PERSONS_PER_DECK)),
+        ], axis=2)
+
+    ##############################
+    # Helpers
+    ##############################
+
+    def busy(self):
+        return self.status == STATUS_BUSY
+
+    def zone_counts(self):
+        """Number of cards per game, player and zone, zones ordered as in ZONES"""
+        return np.stack([
+            self.deck_size,
+            self.hand.sum(axis=2),
+            self.table.sum(axis=2),
+            self.grave.sum(axis=2),
+        ], axis=2)
+
+    def evaluate(self):
+        """Static eval of every game, see 'static_eval'"""
+        return static_eval(self.health, self.zone_counts())
+
+    def can_play_person(self, games):
+        """Whether the active player of the games can play a person: none played this round
+        and one in hand"""
+        p = self.turn[games] - 1
+        persons_in_hand = (self.hand[games, p] * self.is_person).sum(axis=1)
+        return (self.last_turn_person[games, p] != self.round[games]) & (persons_in_hand > 0)
+
+    ##############################
+    # Commands
+    ##############################
+
+    def setup(self):
+        """Shuffles the decks and draws the starting hands, see 'Engine.setup_game'"""
+        self.decks = self.rng.permuted(self.decks, axis=2)
+        games = np.arange(self.games)
+        for p in (0, 1):
+            for _ in range(Game.START_DRAW_NUMBER):
+                self.draw(games, np.full(self.games, p))
+        self.status[:] = STATUS_BUSY
+
+    def draw(self, games, p):
+        """Moves the top card of the decks to the hands, see 'Engine.draw'"""
+        top = self.deck_size[games, p] - 1
+        cards = self.decks[games, p, top]
+        self.deck_size[games, p] -= 1
+        self.hand[games, p, cards] += 1
+
+    def play_person(self, games):
+        """Moves a person from hand to table, see 'Engine.play_person'"""
+        p = self.turn[games] - 1
+        cards = np.argmax((self.hand[games, p] > 0) & self.is_person, axis=1)
+        self.hand[games, p, cards] -= 1
+        self.table[games, p, cards] += 1
+        self.last_turn_person[games, p] = self.round[games]
+
+    def end_turn(self, games):
+        """Leaves the main phase: debate and upkeep have no moves, so continues to the draw
+        phase of the other player, see 'Engine.next_phase'"""
+        self.round[games] += self.turn[games] == 2
+        self.turn[games] = np.where(self.turn[games] == 1, 2, 1)
+        self.phase[games] = PHASE_DRAW
+
+    def step(self):
+        """Plays a move in every busy game"""
+        busy = self.busy()
+
+        # game over after the last round, or when a deck runs out
+        over = busy & (self.round > self.max_rounds)
+        drawing = np.flatnonzero(busy & ~over & (self.phase == PHASE_DRAW))
+        empty = drawing[self.deck_size[drawing, self.turn[drawing] - 1] == 0]
+        over[empty] = True
+        self.status[over] = STATUS_DONE
+        busy &= ~over
+
+        main = np.flatnonzero(busy & (self.phase == PHASE_MAIN))
+        drawing = np.flatnonzero(busy & (self.phase == PHASE_DRAW))
+
+        # main phase, play a person or pass
+        playing = self.can_play_person(main) & (self.rng.random(len(main)) < self.person_chance)
+        self.play_person(main[playing])
+        self.end_turn(main[~playing])
+
+        # draw phase, main is skipped when no person can be played
+        self.draw(drawing, self.turn[drawing] - 1)
+        to_main = self.can_play_person(drawing)
+        self.phase[drawing[to_main]] = PHASE_MAIN
+        self.end_turn(drawing[~to_main])
+
+        self.moves[busy] += 1
+
+    def run(self, max_steps=None):
+        """Steps until every game is over"""
+        steps = 0
+        while self.busy().any() and (max_steps is None or steps < max_steps):
+            self.step()
+            steps += 1
+        return steps
+
+    def winners(self):
+        """1 or 2 for the player with the most health, 0 for a draw"""
+        health1, health2 = self.health[:, 0], self.health[:, 1]
+        return np.where(health1 > health2, 1, np.where(health2 > health1, 2, 0))
+
+    ##############################
+    # Engine data
+    ##############################
+
+    def to_data(self, game):
+        """Game data of one of the games for 'core.engine.Engine'"""
+        data = {
+            'pk': None,
+            'status': Game.STATUS_ORDER[self.status[game]],
+            'turn': int(self.turn[game]),
+            'round': int(self.round[game]),
+            'phase': Game.PHASE_ORDER[self.phase[game]],
+            'players': [],
+        }
+        gcard_pk = 0
+        for p in (0, 1):
+            player = {
+                'pk': p + 1,
+                'health': int(self.health[game, p]),
+                'pool': int(self.pool[game, p]),
+                'last_turn_person': int(self.last_turn_person[game, p]),
+                'deck': {},
+                'hand': {},
+                'table': {},
+                'grave': {},
+            }
+            zones = [
+                (GameCard.SLOT_DECK, self.decks[game, p, :self.deck_size[game, p]]),
+                (GameCard.SLOT_HAND, np.repeat(np.arange(len(self.cards)), self.hand[game, p])),
+                (GameCard.SLOT_TABLE, np.repeat(np.arange(len(self.cards)), self.table[game, p])),
+                (GameCard.SLOT_GRAVE, np.repeat(np.arange(len(self.cards)), self.grave[game, p])),
+            ]
+            for slot, cards in zones:
+                for pos, card in enumerate(cards, 1):
+                    gcard_pk += 1
+                    player[slot][gcard_pk] = {
+                        'pk': gcard_pk,
+                        'card_id': self.cards[card].pk,
+                        'pos': pos,
+                        'slot': slot,
+                        'tapped': False,
+                    }
+            data['players'].append(player)
+        return data
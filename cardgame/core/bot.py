@@ -0,0 +1,794 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+from core import catalog
+from core.cache import PositionCache
+from core.constants import GameCard
+from core.engine import MonteCarloEngineProxy, Move, RecordingEngineProxy, create_random_data
+from core.evaluation import SLOT_WEIGHTS, ZONES, static_eval
+
+
+class SearchTimeout(Exception):
+    """The deadline of an iterative deepening search passed, or the search was stopped"""
+
+
+class TranspositionTable:
+    """Fixed size table of search results keyed by state hash. A slot is replaced by a
+    deeper search, or by any search once its entry is from an older generation."""
+    BOUND_EXACT = 'exact'
+    BOUND_LOWER = 'lower'
+    BOUND_UPPER = 'upper'
+
+    def __init__(self, size=2 ** 16):
+        self.size = size
+        self.entries = [None] * size
+        self.generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def new_search(self):
+        self.generation += 1
+
+    def get(self, key):
+        """Returns (value, depth, bound) or None"""
+        entry = self.entries[key % self.size]
+        if entry is None or entry[0] != key:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry[1:4]
+
+    def peek(self, key):
+        """Like 'get', without counting a hit or miss"""
+        entry = self.entries[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1:4]
+
+    def best_moves(self, key):
+        """Key of the best moves found in the position, see 'moves_key', or None"""
+        entry = self.entries[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        return entry[5]
+
+    def put(self, key, value, depth, bound, best=None):
+        i = key % self.size
+        entry = self.entries[i]
+        if entry is not None:
+            if depth < entry[2] and entry[4] == self.generation:
+                return
+            if entry[0] != key:
+                self.stats['evictions'] += 1
+        self.entries[i] = (key, value, depth, bound, self.generation, best)
+
+
+class SearchNode:
+    """Node of the bot search tree, holding the moves that lead to it from its parent.
+    Monte Carlo search also keeps its visits, total rollout value and untried moves."""
+    __slots__ = ('parent', 'children', 'moves', 'value', 'same_player', 'game_over',
+                 'visits', 'total', 'untried')
+
+    def __init__(self, parent, moves):
+        self.parent = parent
+        self.children = []
+        self.moves = moves
+        self.value = None
+        self.same_player = None
+        self.game_over = False
+        self.visits = 0
+        self.total = 0.0
+        self.untried = None
+
+    def __repr__(self):
+        return '{}(moves={}, value={})'.format(self.__class__.__name__, self.moves, self.value)
+
+    def is_root(self):
+        return self.parent is None
+
+    def add_child(self, moves):
+        child = SearchNode(self, moves)
+        self.children.append(child)
+        return child
+
+    def tag(self):
+        if self.is_root():
+            return 'root'
+        return '{} {}'.format(','.join(move.type_ for move in self.moves), self.value)
+
+
+# zones the card of a move leaves and enters
+MOVE_ZONES = {
+    Move.TYPE_DRAW: (GameCard.SLOT_DECK, GameCard.SLOT_HAND),
+    Move.TYPE_PERSON: (GameCard.SLOT_HAND, GameCard.SLOT_TABLE),
+}
+
+
+def static_eval_gain(moves):
+    """Static eval gain of the moves for the player making them, from the zones their cards
+    move between. Estimated without playing the moves, so phase changes are left out."""
+    gain = 0
+    for move in moves:
+        zones = MOVE_ZONES.get(move.type_)
+        if zones is not None:
+            gain += SLOT_WEIGHTS[zones[1]] - SLOT_WEIGHTS[zones[0]]
+    return gain
+
+
+def order_by_static_eval(bot, moves_list, is_player_1):
+    """Move ordering by the estimated static eval gain for the player to move, passing
+    last. None of the moves is played."""
+    return sorted(moves_list, key=lambda moves: (moves[0].is_type_pass(), -static_eval_gain(moves)))
+
+
+def order_by_search_value(bot, moves_list, is_player_1):
+    """Move ordering with the best moves of the position in the transposition table first,
+    e.g. from an earlier iteration of iterative deepening, then by static eval gain. None
+    of the moves is played."""
+    moves_list = order_by_static_eval(bot, moves_list, is_player_1)
+    best = bot.tt.best_moves(bot.engine.hash)
+    if best is not None:
+        for i, moves in enumerate(moves_list):
+            if moves_key(moves) == best:
+                moves_list.insert(0, moves_list.pop(i))
+                break
+    return moves_list
+
+
+def random_rollout_policy(bot, moves_list, rng):
+    return rng.choice(moves_list)
+
+
+def heavy_rollout_policy(bot, moves_list, rng):
+    """Greedy playout: the moves with the best static eval for the player to move,
+    ties broken at random"""
+    is_player_1 = bot.engine.data['turn'] == 1
+    best_value = None
+    best = []
+    for moves in moves_list:
+        undos = [bot.engine.apply_move(move) for move in moves]
+        value = bot._get_static_eval()
+        bot._undo_moves(undos)
+        value = value if is_player_1 else -value
+        if best_value is None or value > best_value:
+            best_value = value
+            best = [moves]
+        elif value == best_value:
+            best.append(moves)
+    return rng.choice(best)
+
+
+def moves_key(moves):
+    """Identifies moves across engine copies, e.g. in other processes. Moves of the same
+    identity, see 'Move.identity', have the same key."""
+    return tuple(move.identity() for move in moves)
+
+
+def swap_gcards(root, swaps):
+    """Replaces the game cards of the moves in the subtree of the root by the game cards of
+    'swaps', keyed by the pk of the card they replace"""
+    def swapped(moves):
+        return [Move(move.type_, swaps.get(move.gcard['pk'], move.gcard)) if move.gcard else move
+                for move in moves]
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        if node is not root:
+            node.moves = swapped(node.moves)
+        if node.untried:
+            node.untried = [swapped(moves) for moves in node.untried]
+        nodes.extend(node.children)
+
+
+def search_root_children(data, cards, keys, depth, bot_kwargs):
+    """Worker of the parallel search: minimax values of the root children with the keys"""
+    catalog.register(cards)
+    bot = Bot(MonteCarloEngineProxy(data), **bot_kwargs)
+    is_player_1 = bot.engine.data['turn'] == 1
+    values = {}
+    for child in bot._add_children(bot.root):
+        key = moves_key(child.moves)
+        if key not in keys:
+            continue
+        undos = bot._apply_node(child)
+        next_is_player_1 = is_player_1 if child.same_player else not is_player_1
+        values[key] = bot.minimax(child, depth - 1, next_is_player_1)
+        bot._undo_node(undos)
+    return values
+
+
+def search_mcts_tree(data, cards, seed, mcts_kwargs, bot_kwargs):
+    """Worker of the parallel search: visits and total value of the root children of an
+    independent Monte Carlo tree"""
+    catalog.register(cards)
+    bot = Bot(MonteCarloEngineProxy(data), **bot_kwargs)
+    bot.analyze_mcts(rng=Random(seed), **mcts_kwargs)
+    return {moves_key(child.moves): (child.visits, child.total) for child in bot.root.children}
+
+
+class Bot:
+    """Searches the moves with alpha-beta pruned minimax. Values are from the perspective
+    of player 1, who maximizes, player 2 minimizes."""
+
+    def __init__(self, engine, move_ordering=order_by_search_value, tt_size=2 ** 16, position_cache=None):
+        # single engine copy for the whole search, moves are applied and undone in place
+        self.engine = MonteCarloEngineProxy(engine.data)
+        self.move_ordering = move_ordering
+        self.tt_size = tt_size
+        self.tt = TranspositionTable(tt_size)
+        # optional 'core.cache.PositionCache' of exact values, shared between bots and runs
+        self.position_cache = position_cache
+        self.stats = {'nodes': 0, 'pruned': 0, 'iterations': 0, 'depth': 0,
+                      'cache_hits': 0, 'cache_misses': 0}
+        self.root = SearchNode(None, [])
+        # the search that built the tree of the root, only Monte Carlo search grows a tree further
+        self._tree_search = None
+        # deadline of the minimax search being run, see 'analyze'
+        self._deadline = None
+        # set from another thread to stop the minimax search being run, see 'BotSession'
+        self._stopped = False
+
+    def analyze(self, depth=1, time_budget=None, max_depth=None):
+        """Minimax search to the depth. With a time budget (in seconds) or a max depth the
+        search deepens iteratively instead, from depth 1 until the deadline or the max depth,
+        and the result of the deepest finished search is returned. Depth 1 always finishes.
+        Every search starts from a fresh root, the best moves of earlier iterations and
+        analyses in the transposition table seed the move ordering."""
+        if max_depth is not None and max_depth < 1:
+            raise Exception('expected a max depth of at least 1')
+        is_player_1 = self.engine.data['turn'] == 1
+        self._tree_search = 'minimax'
+        if time_budget is None and max_depth is None:
+            self.root = SearchNode(None, [])
+            self.tt.new_search()
+            best_eval = self.minimax(self.root, depth, is_player_1)
+            self.stats['depth'] = depth
+            return best_eval, self._get_best_moves(is_player_1)
+
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        result = None
+        depth = 1
+        while max_depth is None or depth <= max_depth:
+            if result is not None and deadline is not None and time.monotonic() >= deadline:
+                break
+            root = SearchNode(None, [])
+            self.tt.new_search()
+            self._deadline = deadline if result is not None else None
+            try:
+                best_eval = self.minimax(root, depth, is_player_1)
+            except SearchTimeout:
+                break
+            finally:
+                self._deadline = None
+            self.root = root
+            self.stats['depth'] = depth
+            result = best_eval, self._get_best_moves(is_player_1)
+            depth += 1
+        return result
+
+    def analyze_mcts(self, iterations=1000, time_budget=None, rollout_policy=random_rollout_policy,
+                     rollout_depth=20, exploration=1.0, rng=None):
+        """UCT Monte Carlo tree search, until the iterations are done or the time budget
+        (in seconds) is spent. Returns the mean rollout value and the moves of the most
+        visited root child, values are from the perspective of player 1."""
+        if iterations is None and time_budget is None:
+            raise Exception('expected iterations or a time budget')
+        # the children of a minimax or parallel search have no statistics to grow on
+        if self._tree_search not in (None, 'mcts'):
+            self.root = SearchNode(None, [])
+        self._tree_search = 'mcts'
+        rng = rng or Random()
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        i = 0
+        while iterations is None or i < iterations:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self._mcts_iteration(rollout_policy, rollout_depth, exploration, rng)
+            i += 1
+        self.stats['iterations'] = i
+
+        best = max(self.root.children, key=lambda child: child.visits, default=None)
+        if best is None:
+            raise Exception('expected best moves')
+        return round(best.total / best.visits, 2), best.moves
+
+    def _mcts_iteration(self, rollout_policy, rollout_depth, exploration, rng):
+        node = self.root
+        path_undos = []
+
+        # selection
+        while node.untried == [] and node.children:
+            node = self._select_uct(node, exploration)
+            path_undos.append(self._apply_node(node))
+
+        # expansion
+        if node.untried is None:
+            node.untried = self._get_moves()
+        if node.untried:
+            moves = node.untried.pop(rng.randrange(len(node.untried)))
+            node = node.add_child(moves)
+            path_undos.append(self._apply_node(node))
+            self.stats['nodes'] += 1
+
+        value = self._rollout(rollout_policy, rollout_depth, rng)
+        for undos in reversed(path_undos):
+            self._undo_node(undos)
+
+        # backpropagation
+        while node is not None:
+            node.visits += 1
+            node.total += value
+            node = node.parent
+
+    def _select_uct(self, node, exploration):
+        # the engine is at the node, its player to move is the one choosing the child
+        sign = 1 if self.engine.data['turn'] == 1 else -1
+        log_visits = math.log(node.visits)
+
+        def uct(child):
+            if not child.visits:
+                return float('inf')
+            exploit = sign * child.total / child.visits
+            return exploit + exploration * math.sqrt(log_visits / child.visits)
+        return max(node.children, key=uct)
+
+    def _rollout(self, rollout_policy, rollout_depth, rng):
+        undos = []
+        for _ in range(rollout_depth):
+            if self.engine.is_status_finished():
+                break
+            moves_list = self._get_moves()
+            if not moves_list:
+                break
+            moves = rollout_policy(self, moves_list, rng)
+            undos.extend(self.engine.apply_move(move) for move in moves)
+        value = self._get_static_eval()
+        self._undo_moves(undos)
+        return value
+
+    def analyze_parallel(self, workers=None, mode='minimax', depth=1, seed=None, executor=None,
+                         **mcts_kwargs):
+        """Root parallel search over a process pool. Only the state data is shipped to the
+        workers. In 'minimax' mode the root children are split over the workers, in 'mcts'
+        mode every worker grows an independent tree and their root statistics are merged.
+        Pass an executor to reuse its worker processes between moves."""
+        self.root = SearchNode(None, [])
+        self._tree_search = 'parallel'
+        children = {moves_key(child.moves): child for child in self._add_children(self.root)}
+        # e.g. the game is over
+        if not children:
+            raise Exception('expected best moves')
+        workers = workers or os.cpu_count()
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        bot_kwargs = {'move_ordering': self.move_ordering, 'tt_size': self.tt_size}
+        data = self.engine.data
+        # the workers get the cards of the game, their catalog may be empty
+        cards = catalog.get_cards({
+            gcard['card_id'] for player in data['players'] for slot in self.engine.SLOTS
+            for gcard in player[slot].values()
+        })
+        try:
+            if mode == 'minimax':
+                keys = list(children)
+                futures = [
+                    executor.submit(search_root_children, data, cards, set(keys[i::workers]), depth,
+                                    bot_kwargs)
+                    for i in range(min(workers, len(keys)))
+                ]
+                for future in futures:
+                    for key, value in future.result().items():
+                        children[key].value = value
+            elif mode == 'mcts':
+                rng = Random(seed)
+                futures = [
+                    executor.submit(search_mcts_tree, data, cards, rng.getrandbits(32), mcts_kwargs, bot_kwargs)
+                    for _ in range(workers)
+                ]
+                for future in futures:
+                    for key, (visits, total) in future.result().items():
+                        children[key].visits += visits
+                        children[key].total += total
+            else:
+                raise Exception('unknown mode {}'.format(mode))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        is_player_1 = self.engine.data['turn'] == 1
+        if mode == 'minimax':
+            best_moves = self._get_best_moves(is_player_1)
+            best_eval = next(child.value for child in self.root.children if child.moves is best_moves)
+            return best_eval, best_moves
+        best = max(self.root.children, key=lambda child: child.visits, default=None)
+        if best is None:
+            raise Exception('expected best moves')
+        return round(best.total / best.visits, 2), best.moves
+
+    def advance(self, moves):
+        """Plays the moves of a child of the root, by either player, on the search engine and
+        keeps the subtree of that child as the new root. A fresh root when no child matches.
+        The child can play an interchangeable card instead, its subtree then plays the cards
+        the other way round."""
+        key = moves_key(moves)
+        root = next((child for child in self.root.children if moves_key(child.moves) == key), None)
+        swaps = {}
+        if root is not None:
+            zones = self.engine.get_player()
+            for child_move, move in zip(root.moves, moves):
+                if child_move.gcard is not None and child_move.gcard['pk'] != move.gcard['pk']:
+                    # the search engine's copy of the card played, in the zone of the child's card
+                    swaps[child_move.gcard['pk']] = zones[child_move.gcard['slot']][move.gcard['pk']]
+                    swaps[move.gcard['pk']] = child_move.gcard
+        for move in moves:
+            self.engine.apply_move(move)
+        if root is None:
+            root = SearchNode(None, [])
+        elif swaps:
+            swap_gcards(root, swaps)
+        root.parent = None
+        self.root = root
+
+    def export_tree(self):
+        """Debug export of the search tree as a treelib tree, e.g. for 'show()'"""
+        from treelib import Tree
+
+        tree = Tree()
+        nodes = [(self.root, None)]
+        while nodes:
+            node, parent_id = nodes.pop()
+            node_id = id(node)
+            tree.create_node(node.tag(), node_id, parent=parent_id)
+            nodes.extend((child, node_id) for child in reversed(node.children))
+        return tree
+
+    def _get_best_moves(self, is_player_1=True):
+        best_moves = None
+        best_value = float('-inf') if is_player_1 else float('inf')
+        for child in self.root.children:
+            value = child.value
+            if value is None:
+                continue
+            if (is_player_1 and value > best_value) or (not is_player_1 and value < best_value):
+                best_value = value
+                best_moves = child.moves
+        if not best_moves:
+            raise Exception('expected best moves')
+        return best_moves
+
+    def _get_static_eval(self):
+        """Static eval of the current position, see 'core.evaluation.static_eval'"""
+        return static_eval(*self._get_position())
+
+    def _get_position(self):
+        """Health and zone counts of the current position, the arguments of 'static_eval'"""
+        players = self.engine.data['players']
+        health = [player['health'] for player in players]
+        zone_counts = [[len(player[zone]) for zone in ZONES] for player in players]
+        return health, zone_counts
+
+    def _get_moves(self):
+        """Lists the moves of every child of the current position"""
+        e = self.engine
+        moves_list = []
+        if e.is_status_finished():
+            return moves_list
+
+        # pass
+        if e.is_action_phase():
+            moves_list.append([Move(Move.TYPE_PASS)])
+
+        # get all moves
+        moves = e.get_available_moves()
+        if not moves:
+            return moves_list
+
+        # make all possible combinations
+
+        # persons
+        # add each person as a node, no combinations
+        if moves[0].is_type_person():
+            for move in moves:
+                moves_list.append([move])
+
+        # draw
+        # there can only be 1 draw for active player
+        elif moves[0].is_type_draw():
+            moves_list.append(moves)
+
+        else:
+            raise Exception('todo move type')
+        return moves_list
+
+    def _add_children(self, parent, moves_list=None):
+        return list(self._iter_children(parent, moves_list))
+
+    def _iter_children(self, parent, moves_list=None):
+        """Adds the children of the parent one at a time, a child is only built once the
+        search gets to it"""
+        for moves in self._get_moves() if moves_list is None else moves_list:
+            yield parent.add_child(moves)
+
+    def _apply_node(self, node):
+        """Plays the moves leading to the node on the search engine, returns the undo entries"""
+        turn_at_start = self.engine.data['turn']
+        undos = [self.engine.apply_move(move) for move in node.moves]
+        # can be next player if unable to play any hand card, and nothing on table
+        node.same_player = self.engine.data['turn'] == turn_at_start
+        node.game_over = self.engine.is_status_finished()
+        return undos
+
+    def _undo_node(self, undos):
+        self._undo_moves(undos)
+
+    def _undo_moves(self, undos):
+        for undo in reversed(undos):
+            self.engine.undo_move(undo)
+
+    def minimax(self, position, depth, is_player_1, alpha=-float('inf'), beta=float('inf')):
+        """Alpha-beta search. When a move keeps the turn with the same player ('same_player')
+        the child is searched for the same side with the same window.
+        The transposition table is consulted before expanding, except at the root which
+        needs the values of its children."""
+        self.stats['nodes'] += 1
+        if self._stopped or (self._deadline is not None and time.monotonic() >= self._deadline):
+            raise SearchTimeout()
+        if depth <= 0 or position.game_over:
+            return self._get_static_eval()
+
+        state_hash = self.engine.hash
+        alpha_start, beta_start = alpha, beta
+        if not position.is_root():
+            entry = self.tt.get(state_hash)
+            if entry and entry[1] >= depth:
+                tt_value, _, bound = entry
+                if bound == TranspositionTable.BOUND_EXACT:
+                    return tt_value
+                elif bound == TranspositionTable.BOUND_LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if beta <= alpha:
+                    return tt_value
+            if self.position_cache is not None:
+                cached_value = self.position_cache.get(state_hash, depth)
+                if cached_value is None:
+                    self.stats['cache_misses'] += 1
+                else:
+                    self.stats['cache_hits'] += 1
+                    self.tt.put(state_hash, cached_value, depth, TranspositionTable.BOUND_EXACT)
+                    return cached_value
+
+        moves_list = self._get_moves()
+        if not moves_list:
+            return self._get_static_eval()
+        if self.move_ordering:
+            moves_list = self.move_ordering(self, moves_list, is_player_1)
+        children = self._iter_children(position, moves_list)
+
+        best = None
+        if is_player_1:
+            value = -float('inf')
+            for i, child in enumerate(children):
+                undos = self._apply_node(child)
+                next_is_player_1 = is_player_1 if child.same_player else not is_player_1
+                try:
+                    child.value = self.minimax(child, depth - 1, next_is_player_1, alpha, beta)
+                finally:
+                    self._undo_node(undos)
+                if child.value > value:
+                    value, best = child.value, child.moves
+                alpha = max(alpha, value)
+                if beta <= alpha:
+                    self.stats['pruned'] += len(moves_list) - i - 1
+                    break
+
+        else:  # player 2
+            value = float('inf')
+            for i, child in enumerate(children):
+                undos = self._apply_node(child)
+                next_is_player_1 = is_player_1 if child.same_player else not is_player_1
+                try:
+                    child.value = self.minimax(child, depth - 1, next_is_player_1, alpha, beta)
+                finally:
+                    self._undo_node(undos)
+                if child.value < value:
+                    value, best = child.value, child.moves
+                beta = min(beta, value)
+                if beta <= alpha:
+                    self.stats['pruned'] += len(moves_list) - i - 1
+                    break
+
+        if value <= alpha_start:
+            bound = TranspositionTable.BOUND_UPPER
+        elif value >= beta_start:
+            bound = TranspositionTable.BOUND_LOWER
+        else:
+            bound = TranspositionTable.BOUND_EXACT
+        # no move of a node that failed low is known to be best
+        best = moves_key(best) if bound != TranspositionTable.BOUND_UPPER else None
+        self._store(state_hash, value, depth, bound, best)
+        return value
+
+    def _store(self, state_hash, value, depth, bound, best=None):
+        self.tt.put(state_hash, value, depth, bound, best)
+        if self.position_cache is not None and bound == TranspositionTable.BOUND_EXACT:
+            self.position_cache.put(state_hash, value, depth)
+
+    def play(self):
+        func = getattr(self, 'play_{}'.format(self.engine.game.phase))
+        func()
+
+    def play_main(self):
+        p = self.engine.active_player
+        # play land
+        for gcard in p.hand() and gcard.is_affordable():
+            if gcard.card.is_person():
+                self.engine.play_land(p, gcard)
+                break
+        # play creature
+        for gcard in p.hand():
+            if gcard.card.is_creature() and gcard.is_affordable():
+                self.pay(p, gcard)
+
+    def pay(self, p, gcard):
+        while p.pool < gcard.card.mana:
+            # for every land see if you can tap it
+            land = p.get_any_untapped_persons()
+            self.engine.use_ability(p, land, land.abilities.get())
+
+
+class BotSession:
+    """Bot that stays with a game. Every move played, by either player, re-roots the search
+    tree on the child of the move. In 'mcts' mode the subtree of the child, with its visits,
+    is reused by the next analysis. In 'minimax' mode every analysis builds a fresh tree and
+    only the transposition table carries over, its best moves seeding the move ordering.
+    With 'ponder' the bot keeps searching in a background thread after each move until the
+    next analysis or move: more Monte Carlo iterations on the tree in 'mcts' mode, deeper
+    minimax searches filling the table in 'minimax' mode."""
+
+    def __init__(self, engine, mode='minimax', ponder=False, mcts_kwargs=None, **bot_kwargs):
+        if mode not in ('minimax', 'mcts'):
+            raise Exception('unknown mode {}'.format(mode))
+        self.bot = Bot(engine, **bot_kwargs)
+        self.mode = mode
+        self.ponder = ponder
+        self.mcts_kwargs = mcts_kwargs or {}
+        self._thread = None
+        self._stopping = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_pondering()
+
+    def analyze(self, **kwargs):
+        """Best value and moves with 'Bot.analyze' or 'Bot.analyze_mcts', depending on the mode"""
+        self.stop_pondering()
+        if self.mode == 'mcts':
+            return self.bot.analyze_mcts(**dict(self.mcts_kwargs, **kwargs))
+        return self.bot.analyze(**kwargs)
+
+    def play(self, moves):
+        """Plays the moves, and starts pondering on the new position"""
+        self.stop_pondering()
+        self.bot.advance(moves)
+        if self.ponder and not self.bot.engine.is_status_finished():
+            self.start_pondering()
+
+    def start_pondering(self):
+        self.stop_pondering()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._ponder, daemon=True)
+        self._thread.start()
+
+    def stop_pondering(self):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.bot._stopped = True
+        self._thread.join()
+        self.bot._stopped = False
+        self._thread = None
+
+    def _ponder(self):
+        bot = self.bot
+        if self.mode == 'mcts':
+            rollout_policy = self.mcts_kwargs.get('rollout_policy', random_rollout_policy)
+            rollout_depth = self.mcts_kwargs.get('rollout_depth', 20)
+            exploration = self.mcts_kwargs.get('exploration', 1.0)
+            rng = self.mcts_kwargs.get('rng') or Random()
+            while not self._stopping:
+                bot._mcts_iteration(rollout_policy, rollout_depth, exploration, rng)
+            return
+
+        # the results are dropped, only the transposition table is kept
+        is_player_1 = bot.engine.data['turn'] == 1
+        depth = 1
+        while not self._stopping:
+            bot.tt.new_search()
+            try:
+                bot.minimax(SearchNode(None, []), depth, is_player_1)
+            except SearchTimeout:
+                return
+            depth += 1
+
+
+def play_self_play_game(persons, opinions, seed, depth=1, max_rounds=30, record_events=False,
+                        position_cache=None):
+    """Plays a complete game in memory with a bot for both players. The game is over after
+    'max_rounds' rounds, the player with the most health wins."""
+    rng = Random(seed)
+    data = create_random_data(persons, opinions, rng)
+    engine_class = RecordingEngineProxy if record_events else MonteCarloEngineProxy
+    engine = engine_class(data, rng)
+    engine.setup_game()
+    # the bot keeps its own copy in step with the game
+    bot = Bot(engine, position_cache=position_cache)
+    moves_played = 0
+    while not engine.is_status_finished():
+        if engine.data['round'] > max_rounds:
+            engine.next_status()
+            break
+        _, moves = bot.analyze(depth)
+        for move in moves:
+            engine.apply_move(move)
+        bot.advance(moves)
+        moves_played += 1
+
+    p1, p2 = engine.data['players']
+    winner = None
+    if p1['health'] != p2['health']:
+        winner = 1 if p1['health'] > p2['health'] else 2
+    return {
+        'seed': seed,
+        'winner': winner,
+        'rounds': min(engine.data['round'], max_rounds),
+        'moves': moves_played,
+        'health1': p1['health'],
+        'health2': p2['health'],
+        'events': engine.events if record_events else None,
+        'cache_hits': bot.stats['cache_hits'],
+        'cache_misses': bot.stats['cache_misses'],
+    }
+
+
+def play_self_play_games(persons, opinions, seeds, depth=1, max_rounds=30, log_sample=0.0,
+                         cache_path=None, cache_readonly=True):
+    """Worker of the self-play simulation, plays a game per seed. The event log of a game
+    is kept with chance 'log_sample'. The games share the position cache at 'cache_path'."""
+    position_cache = PositionCache(cache_path, cache_readonly) if cache_path else None
+    results = []
+    try:
+        for seed in seeds:
+            record_events = Random(seed).random() < log_sample
+            results.append(play_self_play_game(persons, opinions, seed, depth, max_rounds, record_events,
+                                               position_cache))
+    finally:
+        if position_cache is not None:
+            position_cache.close()
+    return results
+
+
+def play_self_play_pool(persons, opinions, seeds, workers=1, **kwargs):
+    """Plays the self-play games, over a process pool when there is more than one worker.
+    The results are in the order of the seeds."""
+    if workers == 1:
+        return play_self_play_games(persons, opinions, seeds, **kwargs)
+    results = []
+    chunk_size = max(1, len(seeds) // (workers * 4))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_self_play_games, persons, opinions, chunk, **kwargs)
+                   for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    return results
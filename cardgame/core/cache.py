@@ -0,0 +1,93 @@
+"""Persistent cache of search values by state hash in a SQLite file. It survives between
+runs and is shared by the worker processes of a run, who mostly read it."""
+import sqlite3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS position (
+    hash INTEGER PRIMARY KEY,
+    value REAL NOT NULL,
+    depth INTEGER NOT NULL
+)
+'''
+UPSERT = '''
+INSERT INTO position (hash, value, depth) VALUES (?, ?, ?)
+ON CONFLICT (hash) DO UPDATE SET value = excluded.value, depth = excluded.depth
+WHERE excluded.depth > position.depth
+'''
+
+
+def to_signed(key):
+    # state hashes are unsigned 64 bit, SQLite integers are signed
+    return key - 2 ** 64 if key >= 2 ** 63 else key
+
+
+class PositionCache:
+    """Exact search values with their depth by state hash. Lookups are cached in memory,
+    new values are buffered and written in one transaction by 'flush'. A read only cache
+    never writes, e.g. for the workers of a simulation."""
+    WRITE_BUFFER_SIZE = 1000
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self.connection = sqlite3.connect('file:{}?mode=ro'.format(path), uri=True, timeout=30)
+        else:
+            self.connection = sqlite3.connect(path, timeout=30)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(SCHEMA)
+            self.connection.commit()
+        self._entries = {}
+        self._pending = {}
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute('SELECT COUNT(*) FROM position').fetchone()[0]
+
+    def get(self, key, depth):
+        """Value of the position searched to at least the depth, or None"""
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            entry = self._entries[key] = self.connection.execute(
+                'SELECT value, depth FROM position WHERE hash = ?', (to_signed(key),)).fetchone()
+        if entry is None or entry[1] < depth:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def put(self, key, value, depth):
+        if self.readonly:
+            return
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] >= depth:
+            return
+        self._entries[key] = self._pending[key] = (value, depth)
+        if len(self._pending) >= self.WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(UPSERT, (
+                (to_signed(key), value, depth) for key, (value, depth) in self._pending.items()
+            ))
+        self.stats['writes'] += len(self._pending)
+        self._pending = {}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
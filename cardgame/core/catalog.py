@@ -0,0 +1,43 @@
+"""Process wide catalog of the cards keyed by card pk. Game cards only refer to their card
+by 'card_id', the cards themselves are immutable and shared by every game state."""
+from collections import namedtuple
+
+CatalogCard = namedtuple('CatalogCard', ('pk', 'kind', 'support', 'power', 'endurance', 'abilities'))
+
+_cards = {}
+
+
+def register(cards):
+    """Adds the cards to the catalog and returns them as catalog cards. Takes catalog cards
+    or card dicts with a pk, abilities as (cost, benefit) pairs."""
+    registered = []
+    for card in cards:
+        if not isinstance(card, CatalogCard):
+            card = CatalogCard(
+                card['pk'], card['kind'], card['support'], card['power'], card['endurance'],
+                tuple(tuple(ability) for ability in card.get('abilities', ())),
+            )
+        # an unchanged card keeps its interned instance
+        if _cards.get(card.pk) != card:
+            _cards[card.pk] = card
+        registered.append(_cards[card.pk])
+    return registered
+
+
+def get(card_id):
+    return _cards[card_id]
+
+
+def get_cards(card_ids=None):
+    """Catalog cards with the ids, all cards if no ids are given"""
+    if card_ids is None:
+        return list(_cards.values())
+    return [_cards[card_id] for card_id in card_ids]
+
+
+def missing(card_ids):
+    return {card_id for card_id in card_ids if card_id not in _cards}
+
+
+def clear():
+    _cards.clear()
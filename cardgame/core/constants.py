@@ -0,0 +1,98 @@
+"""Constants of the game as plain values, shared by the rules and the models"""
+
+
+class Ability:
+    COST_TAP = 't'
+    COST_CHOICES = (
+        (COST_TAP, 'Tap'),
+    )
+    BENEFIT_M1G = 'm1g'
+    BENEFIT_CHOICES = (
+        (BENEFIT_M1G, 'Adds 1 generic mana'),
+    )
+
+
+class Card:
+    KIND_PERSON = 'person'  # land
+    KIND_OPINION = 'opinion'  # creature
+    KIND_PAPER = 'paper'  # enchantment
+    KIND_EVIDENCE = 'evidence'  # enchant creature
+    KIND_CHOICES = (
+        (KIND_PERSON, 'Person'),
+        (KIND_OPINION, 'Opinion'),
+        (KIND_PAPER, 'Paper'),
+        (KIND_EVIDENCE, 'Evidence'),
+    )
+
+
+class Game:
+    START_DRAW_NUMBER = 7
+
+    STATUS_SETUP = 'setup'
+    STATUS_BUSY = 'busy'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = (
+        (STATUS_SETUP, 'Setup'),
+        (STATUS_BUSY, 'Busy'),
+        (STATUS_DONE, 'Done'),
+    )
+    STATUS_ORDER = [
+        STATUS_SETUP, STATUS_BUSY, STATUS_DONE
+    ]
+
+    PHASE_DRAW = 'draw'
+    PHASE_MAIN = 'main'
+    PHASE_DEBATE = 'debate'
+    PHASE_UPKEEP = 'upkeep'
+    PHASE_CHOICES = (
+        (PHASE_DRAW, 'Draw'),
+        (PHASE_MAIN, 'Main'),
+        (PHASE_DEBATE, 'Debate'),
+        (PHASE_UPKEEP, 'Upkeep'),
+    )
+    PHASE_ORDER = [
+        PHASE_DRAW, PHASE_MAIN, PHASE_DEBATE, PHASE_UPKEEP
+    ]
+
+
+class Player:
+    BELIEVE_START = 20
+
+
+class GameCard:
+    SLOT_DECK = 'deck'
+    SLOT_HAND = 'hand'
+    SLOT_TABLE = 'table'
+    SLOT_GRAVE = 'grave'
+    SLOT_CHOICES = (
+        (SLOT_DECK, 'Deck'),
+        (SLOT_HAND, 'Hand'),
+        (SLOT_TABLE, 'Table'),
+        (SLOT_GRAVE, 'Graveyard'),
+    )
+
+
+class Event:
+    CMD_STATUS = 'status'
+    CMD_SHUFFLE = 'shuffle'
+    CMD_DRAW = 'draw'
+    CMD_PHASE = 'phase'
+    CMD_PASS = 'pass'
+    CMD_PLAY = 'play'
+    CMD_COST = 'cost'
+    CMD_BENEFIT = 'benefit'
+    CMD_CHOICES = (
+        (CMD_STATUS, 'Status'),
+        (CMD_DRAW, 'Draw'),
+        (CMD_SHUFFLE, 'Shuffle'),
+        (CMD_PHASE, 'Phase'),
+        (CMD_PLAY, 'Play'),
+        (CMD_COST, 'Cost'),
+        (CMD_BENEFIT, 'Benefit'),
+    )
+    # events store a command as its index in the order, new commands are only appended
+    CMD_ORDER = [
+        CMD_STATUS, CMD_SHUFFLE, CMD_DRAW, CMD_PHASE, CMD_PASS, CMD_PLAY, CMD_COST, CMD_BENEFIT
+    ]
+    CMD_CODES = {cmd: code for code, cmd in enumerate(CMD_ORDER)}
+    CMD_CODE_CHOICES = tuple(enumerate(CMD_ORDER))
@@ -0,0 +1,510 @@
+import hashlib
+import random
+from collections import OrderedDict
+from copy import deepcopy
+
+from core import catalog
+from core.constants import Ability, Card, Event, Game, GameCard, Player
+
+
+_zobrist_keys = {}
+
+
+def zobrist_key(*parts):
+    """Random 64 bit key for a piece of the game state. Derived from the parts themselves
+    so that it is the same in every process."""
+    try:
+        return _zobrist_keys[parts]
+    except KeyError:
+        digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+        key = _zobrist_keys[parts] = int.from_bytes(digest, 'big')
+        return key
+
+
+def card_identity(card):
+    """Every field of the catalog card but its pk, which comes first. Cards with the same
+    identity are interchangeable."""
+    return card[1:]
+
+
+class Zone(OrderedDict):
+    """Game cards of a player in a slot, keyed by pk and ordered by pos. A card moved into
+    the zone becomes its last card, which for a deck is the top card to draw. Zones compare
+    like dicts, the order is kept in the pos of the cards."""
+    __eq__ = dict.__eq__
+    __ne__ = dict.__ne__
+
+    @classmethod
+    def from_gcards(cls, gcards):
+        return cls((gcard['pk'], gcard) for gcard in sorted(gcards, key=lambda gcard: gcard['pos']))
+
+    def top(self):
+        """Last card of the zone, None when empty"""
+        for pk in reversed(self):
+            return self[pk]
+        return None
+
+
+class GameState:
+    """Helpers to read the game state, kept as a dictionary in 'data'"""
+    GAME_FIELDS = ('status', 'turn', 'round', 'phase')
+    SLOTS = (GameCard.SLOT_DECK, GameCard.SLOT_HAND, GameCard.SLOT_TABLE, GameCard.SLOT_GRAVE)
+
+    ##############################
+    # Game helpers
+    ##############################
+
+    def is_status_setup(self):
+        return self.data['status'] == Game.STATUS_SETUP
+
+    def is_status_busy(self):
+        return self.data['status'] == Game.STATUS_BUSY
+
+    def is_status_finished(self):
+        return self.data['status'] == Game.STATUS_DONE
+
+    def is_phase_draw(self):
+        return self.data['phase'] == Game.PHASE_DRAW
+
+    def is_phase_main(self):
+        return self.data['phase'] == Game.PHASE_MAIN
+
+    def is_phase_debate(self):
+        return self.data['phase'] == Game.PHASE_DEBATE
+
+    def is_action_phase(self):
+        return self.data['phase'] in [Game.PHASE_MAIN, Game.PHASE_DEBATE]
+
+    def is_phase_upkeep(self):
+        return self.data['phase'] == Game.PHASE_UPKEEP
+
+    def get_player(self, active=True):
+        i = self.data['turn'] - 1
+        if not active:
+            i = not i
+        return self.data['players'][i]
+
+    ##############################
+    # Player helpers
+    ##############################
+
+    def has_played_person(self, active=True):
+        player = self.get_player(active)
+        # every player has one turn per round
+        return player['last_turn_person'] == self.data['round']
+
+    def get_hand_persons(self, active=True):
+        player = self.get_player(active)
+        persons = [gc for gc in player['hand'].values() if self.get_card(gc).kind == Card.KIND_PERSON]
+        return persons
+
+    def get_table_opinions(self, active=True, untapped=False):
+        player = self.get_player(active)
+        opinions = [gc for gc in player['table'].values() if self.get_card(gc).kind == Card.KIND_OPINION]
+        if untapped:
+            opinions = [gc for gc in opinions if not gc['tapped']]
+        return opinions
+
+    ##############################
+    # GameCard helpers
+    ##############################
+
+    def get_card(self, gcard):
+        return catalog.get(gcard['card_id'])
+
+
+class Move:
+    TYPE_PASS = 'pass'
+    TYPE_PERSON = 'person'
+    TYPE_DRAW = 'draw'
+
+    def __init__(self, type_, gcard=None):
+        self.type_ = type_
+        self.gcard = gcard
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.type_)
+
+    def is_type_pass(self):
+        return self.type_ == self.TYPE_PASS
+
+    def is_type_person(self):
+        return self.type_ == self.TYPE_PERSON
+
+    def is_type_draw(self):
+        return self.type_ == self.TYPE_DRAW
+
+    def identity(self):
+        """Moves with the same identity lead to equivalent positions: they are of the same
+        type and play the same card in the same state"""
+        if self.gcard is None:
+            return self.type_, None
+        return self.type_, self.gcard['card_id'], self.gcard['slot'], self.gcard['tapped']
+
+
+class Engine(GameState):
+    """Rules of the game, played on the state in 'data'. Nothing is persisted here: saving,
+    logging and flushing are hooks for adaptors, such as the ORM engine."""
+    PLAYER_VALUES = ('health', 'pool', 'last_turn_person')
+
+    def __init__(self, data, rng=None):
+        self.data = deepcopy(data)
+        self.init_state(rng)
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+    def init_state(self, rng=None):
+        # random.Random for shuffling, the random module by default
+        self.rng = rng or random
+        self._undo_gcards = None
+        for player in self.data['players']:
+            for slot in self.SLOTS:
+                player[slot] = Zone.from_gcards(player[slot].values())
+        self.hash = self.compute_hash()
+
+    ##############################
+    # Persistence hooks
+    ##############################
+
+    def save_game(self):
+        return
+
+    def save_gcard(self, gcard_data):
+        return
+
+    def save_player(self, player_data):
+        return
+
+    def flush(self):
+        return
+
+    def log(self, actor_pk, cmd, gcard_pk=None, error=False, comment=None):
+        return
+
+    ##############################
+    # State hash
+    ##############################
+
+    def compute_hash(self):
+        """Zobrist hash of the whole state. Interchangeable cards hash the same, and only
+        the deck order matters for positions."""
+        value = 0
+        for field in self.GAME_FIELDS:
+            value ^= zobrist_key(field, self.data[field])
+        for i, player in enumerate(self.data['players']):
+            for key in self.PLAYER_VALUES:
+                value ^= zobrist_key(i, key, player[key])
+            for slot in self.SLOTS:
+                for gcard in player[slot].values():
+                    value ^= self.gcard_key(i, gcard)
+        return value
+
+    def gcard_key(self, i, gcard):
+        pos = gcard['pos'] if gcard['slot'] == GameCard.SLOT_DECK else None
+        return zobrist_key(i, card_identity(self.get_card(gcard)), gcard['slot'], pos, gcard['tapped'])
+
+    def player_index(self, player):
+        return 0 if player is self.data['players'][0] else 1
+
+    def set_game_value(self, field, value):
+        self.hash ^= zobrist_key(field, self.data[field]) ^ zobrist_key(field, value)
+        self.data[field] = value
+
+    def set_player_value(self, player, key, value):
+        i = self.player_index(player)
+        self.hash ^= zobrist_key(i, key, player[key]) ^ zobrist_key(i, key, value)
+        player[key] = value
+
+    def move_gcard(self, player, gcard, slot, pos):
+        """Moves the game card to the slot at pos. A card moved into a slot becomes its last card."""
+        self.record_gcard(player, gcard)
+        i = self.player_index(player)
+        self.hash ^= self.gcard_key(i, gcard)
+        del player[gcard['slot']][gcard['pk']]
+        gcard['slot'] = slot
+        gcard['pos'] = pos
+        player[slot][gcard['pk']] = gcard
+        self.hash ^= self.gcard_key(i, gcard)
+        self.save_gcard(gcard)
+
+    ##############################
+    # Commands
+    ##############################
+
+    def setup_game(self):
+        for player in self.data['players']:
+            self.shuffle_deck(player)
+            self.draw(player, Game.START_DRAW_NUMBER)
+        self.next_status()
+        self.flush()
+
+    def shuffle_deck(self, player):
+        # randomizes the deck dictionary
+        gcards = list(player['deck'].values())
+        self.rng.shuffle(gcards)
+        for i, gcard in enumerate(gcards):
+            self.move_gcard(player, gcard, GameCard.SLOT_DECK, i + 1)
+        self.log(player['pk'], Event.CMD_SHUFFLE)
+
+    def draw(self, player, qty):
+        # top card located at end of the deck zone, move from deck to hand
+        # drawing from an empty deck ends the game
+        hand_size = len(player['hand'])
+        for i in range(qty):
+            gcard = player['deck'].top()
+            if gcard is None:
+                self.log(player['pk'], Event.CMD_DRAW, error=True, comment='empty deck')
+                self.end_game()
+                return
+            self.move_gcard(player, gcard, GameCard.SLOT_HAND, hand_size + i)
+            self.log(player['pk'], Event.CMD_DRAW, gcard['pk'])
+
+    def next_status(self):
+        i = Game.STATUS_ORDER.index(self.data['status'])
+        new_status = Game.STATUS_ORDER[i + 1]
+        self.set_game_value('status', new_status)
+        self.save_game()
+        self.log(self.get_player(True)['pk'], Event.CMD_STATUS)
+
+    def end_game(self):
+        if not self.is_status_finished():
+            self.set_game_value('status', Game.STATUS_DONE)
+            self.save_game()
+            self.log(self.get_player(True)['pk'], Event.CMD_STATUS)
+
+    def next_phase(self):
+        i = Game.PHASE_ORDER.index(self.data['phase'])
+        try:
+            new_phase = Game.PHASE_ORDER[i + 1]
+        except IndexError:
+            new_phase = Game.PHASE_ORDER[0]
+            # round increases only after player 2 finished
+            if self.data['turn'] == 2:
+                self.set_game_value('round', self.data['round'] + 1)
+            self.set_game_value('turn', 2 if self.data['turn'] == 1 else 1)
+        self.set_game_value('phase', new_phase)
+        self.save_game()
+        self.log(self.get_player()['pk'], Event.CMD_PHASE)
+
+        # auto continue phase if no moves available
+        moves = self.get_available_moves()
+        if not moves:
+            self.next_phase()
+        self.flush()
+
+    def get_available_moves(self):
+        """get moves but for new moves the action has to have been taken on the engine copy.
+        Moves playing interchangeable cards are only listed once."""
+        moves = []
+        if self.is_status_finished():
+            return moves
+
+        # for phase
+        if self.is_phase_debate():
+            opinions = self.get_table_opinions(untapped=True)
+            if opinions:
+                raise Exception('todo')
+
+        elif self.is_phase_main():
+            # get list of available persons to play
+            if not self.has_played_person():
+                hpersons = self.get_hand_persons()
+                # skip to looking at other cards if you cannot play a person
+                if hpersons:
+                    for hperson in hpersons:
+                        moves.append(Move(Move.TYPE_PERSON, hperson))
+                    return self.unique_moves(moves)
+            # otherwise look at all other cards to play
+            # todo other cards, until then only passing is left
+
+        elif self.is_phase_draw():
+            moves.append(Move(Move.TYPE_DRAW))
+
+        elif self.is_phase_upkeep():
+            # not doing anything till such logic is required
+            pass
+        else:
+            raise Exception('what phase?')
+
+        return self.unique_moves(moves)
+
+    def unique_moves(self, moves):
+        """Keeps the first of the moves with the same identity, e.g. one move for all the
+        copies of a person in hand"""
+        unique = {}
+        for move in moves:
+            unique.setdefault(move.identity(), move)
+        return list(unique.values())
+
+    def apply_move(self, move):
+        """Plays the move in place and returns a compact undo entry for 'undo_move':
+        the game and player values before the move and every game card it moved."""
+        undo = (
+            self.hash,
+            tuple(self.data[field] for field in self.GAME_FIELDS),
+            tuple(tuple(p[key] for key in self.PLAYER_VALUES) for p in self.data['players']),
+            [],
+        )
+        self._undo_gcards = undo[3]
+        try:
+            if move.is_type_pass():
+                self.play_pass()
+            elif move.is_type_person():
+                self.play_person(self.get_player()['hand'][move.gcard['pk']])
+            elif move.is_type_draw():
+                self.draw(self.get_player(), 1)
+                if not self.is_status_finished():
+                    self.next_phase()
+            else:
+                raise Exception('what type_ {}?'.format(move.type_))
+        finally:
+            self._undo_gcards = None
+        return undo
+
+    def undo_move(self, undo):
+        """Reverts a move played with 'apply_move'"""
+        state_hash, game_values, player_values, gcards = undo
+        for player, gcard, slot, pos, tapped, after in reversed(gcards):
+            del player[gcard['slot']][gcard['pk']]
+            zone = player[slot]
+            zone[gcard['pk']] = gcard
+            # back in its place, before the cards that followed it
+            for pk in after:
+                zone.move_to_end(pk)
+            gcard['slot'] = slot
+            gcard['pos'] = pos
+            gcard['tapped'] = tapped
+        for field, value in zip(self.GAME_FIELDS, game_values):
+            self.data[field] = value
+        for player, values in zip(self.data['players'], player_values):
+            for key, value in zip(self.PLAYER_VALUES, values):
+                player[key] = value
+        self.hash = state_hash
+
+    def record_gcard(self, player, gcard):
+        """Remembers where the game card was, for undoing the move being applied: its slot,
+        pos and tapped, and the cards after it in its zone"""
+        if self._undo_gcards is not None:
+            zone = player[gcard['slot']]
+            if next(reversed(zone)) == gcard['pk']:
+                # the last card, e.g. a draw from the top of the deck
+                after = ()
+            else:
+                pks = list(zone)
+                after = pks[pks.index(gcard['pk']) + 1:]
+            self._undo_gcards.append((player, gcard, gcard['slot'], gcard['pos'], gcard['tapped'], after))
+
+    def play_pass(self):
+        self.next_phase()
+        self.log(self.get_player()['pk'], Event.CMD_PASS)
+
+    def play_person(self, gcard):
+        # move from hand to table
+        player = self.get_player()
+        table_size = len(player['table'])
+        self.move_gcard(player, gcard, GameCard.SLOT_TABLE, table_size)
+        self.set_player_value(player, 'last_turn_person', self.data['round'])
+        self.save_player(player)
+        self.log(player['pk'], Event.CMD_PLAY, gcard['pk'])
+        # no next phase, can still play opinions
+            
+    def play_creature(self, player, gcard):
+        # todo handle spells
+        # if spell, it should be not be moved to table, but trigger
+        # ability and go to grave
+        hand_size = player.table_size()
+        gcard.slot = GameCard.SLOT_TABLE
+        gcard.pos = hand_size
+        gcard.save()
+        # trigger ability?
+        self.log(player, Event.CMD_PLAY, gcard)
+
+    def use_ability(self, player, gcard, ability):
+        assert ability in gcard.abilities
+        assert gcard.player == player
+        self.ability_cost(player, gcard, ability)
+        self.ability_benefit(player, gcard, ability)
+
+    def ability_cost(self, player, gcard, ability):
+        if ability.cost == Ability.COST_TAP:
+            gcard.tapped = True
+            gcard.save()
+            self.log(player, Event.CMD_COST, gcard, ability, comment=ability.cost)
+        else:
+            raise Exception('unknown cost {}'.format(ability.cost))
+
+    def ability_benefit(self, player, gcard, ability):
+        if ability.benefit == Ability.BENEFIT_M1G:
+            player.pool += 1
+            player.save()
+            self.log(player, Event.CMD_BENEFIT, gcard, comment=ability.benefit)
+        else:
+            raise Exception('unknown benefit {}'.format(ability.benefit))
+
+    def get_board(self):
+        """Summary of the game and both players, as recorded with every event"""
+        p1, p2 = self.data['players']
+        return {
+            'status': self.data['status'], 'turn': self.data['turn'],
+            'round': self.data['round'], 'phase': self.data['phase'],
+            'health1': p1['health'], 'deck1_size': len(p1['deck']),
+            'hand1_size': len(p1['hand']), 'grave1_size': len(p1['grave']),
+            'health2': p2['health'], 'deck2_size': len(p2['deck']),
+            'hand2_size': len(p2['hand']), 'grave2_size': len(p2['grave']),
+        }
+
+
+class MonteCarloEngineProxy(Engine):
+    """In memory engine for searching and simulating"""
+
+
+class RecordingEngineProxy(MonteCarloEngineProxy):
+    """In memory engine that keeps its events as dicts in 'events'"""
+
+    def __init__(self, data, rng=None):
+        super().__init__(data, rng)
+        self.events = []
+
+    def log(self, actor_pk, cmd, gcard_pk=None, error=False, comment=None):
+        self.events.append(dict(actor=actor_pk, command=cmd, gcard=gcard_pk, error=error,
+                                comment=comment, **self.get_board()))
+
+
+def create_random_data(persons, opinions, rng):
+    """In memory version of 'create_random_game': game data for the engine without any rows.
+    Persons and opinions are cards with a pk, they are added to the card catalog."""
+    persons = catalog.register(persons)
+    opinions = catalog.register(opinions)
+    data = {
+        'pk': None,
+        'status': Game.STATUS_SETUP,
+        'turn': 1,
+        'round': 1,
+        'phase': Game.PHASE_DRAW,
+        'players': [],
+    }
+    gcard_pk = 0
+    for player_pk in (1, 2):
+        player = {
+            'pk': player_pk,
+            'health': Player.BELIEVE_START,
+            'pool': 0,
+            'last_turn_person': 0,
+            'deck': {},
+            'hand': {},
+            'table': {},
+            'grave': {},
+        }
+        cards = [rng.choice(persons) for _ in range(20)] + [rng.choice(opinions) for _ in range(40)]
+        for pos, card in enumerate(cards, 1):
+            gcard_pk += 1
+            player['deck'][gcard_pk] = {
+                'pk': gcard_pk,
+                'card_id': card.pk,
+                'pos': pos,
+                'slot': GameCard.SLOT_DECK,
+                'tapped': False,
+            }
+        data['players'].append(player)
+    return data
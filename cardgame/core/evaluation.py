@@ -0,0 +1,25 @@
+"""Static evaluation of a position from the perspective of player 1: the health difference
+plus the weighted zone count differences. Plain Python for the search, 'core.batch' scores
+batches of positions held as NumPy arrays the same way."""
+from core.constants import GameCard
+
+# order of the zones in the zone counts
+ZONES = (GameCard.SLOT_DECK, GameCard.SLOT_HAND, GameCard.SLOT_TABLE, GameCard.SLOT_GRAVE)
+
+# static eval weight of a card per zone, in hundredths of a health point
+SLOT_WEIGHTS = {
+    GameCard.SLOT_TABLE: 30,
+    GameCard.SLOT_HAND: 20,
+    GameCard.SLOT_DECK: 3,
+    GameCard.SLOT_GRAVE: 2,
+}
+
+
+def static_eval(health, zone_counts):
+    """Static eval of a position from the health per player and the zone counts per player,
+    zones ordered as in ZONES"""
+    (health1, health2), (counts1, counts2) = health, zone_counts
+    hundredths = 100 * (health1 - health2)
+    for zone, count1, count2 in zip(ZONES, counts1, counts2):
+        hundredths += (count1 - count2) * SLOT_WEIGHTS[zone]
+    return hundredths / 100
@@ -0,0 +1,44 @@
+"""Compact encoding of the board recorded with the events, see 'Engine.get_board'. An event
+only stores the board fields that changed since the previous event of its game, as packed
+(field index, value) pairs. The board of an event is rebuilt by applying the deltas of the
+events of the game in order, a delta without a previous board holds every field."""
+import struct
+
+from core.constants import Game
+
+BOARD_FIELDS = (
+    'status', 'turn', 'round', 'phase',
+    'health1', 'deck1_size', 'hand1_size', 'grave1_size',
+    'health2', 'deck2_size', 'hand2_size', 'grave2_size',
+)
+# fields stored as their index in the order
+ENUM_FIELDS = {
+    'status': Game.STATUS_ORDER,
+    'phase': Game.PHASE_ORDER,
+}
+PAIR = struct.Struct('<Bh')
+
+
+def encode_delta(board, previous=None):
+    """Changed fields of the board as bytes, None if nothing changed"""
+    pairs = []
+    for i, field in enumerate(BOARD_FIELDS):
+        value = board[field]
+        if previous is not None and previous[field] == value:
+            continue
+        if field in ENUM_FIELDS:
+            value = ENUM_FIELDS[field].index(value)
+        pairs.append(PAIR.pack(i, value))
+    return b''.join(pairs) or None
+
+
+def apply_delta(board, delta):
+    """Board after the delta, as a new dict"""
+    board = dict(board)
+    if delta:
+        for i, value in PAIR.iter_unpack(bytes(delta)):
+            field = BOARD_FIELDS[i]
+            if field in ENUM_FIELDS:
+                value = ENUM_FIELDS[field][value]
+            board[field] = value
+    return board
@@ -0,0 +1,53 @@
+"""Rebuilds game states from the recorded events. Events are dicts with the keys of the
+events of 'RecordingEngineProxy': the actor, command, gcard and error, and the board after
+the command. Events are numbered from 1, state number n is the state after n events.
+
+A shuffle does not record the new deck order, so it can not be replayed: replay continues
+from the snapshot taken after it, see 'needs_snapshot'."""
+from core.constants import Event, GameCard
+
+BOARD_HEALTH = ('health1', 'health2')
+
+
+def needs_snapshot(number, event, interval):
+    """Whether the state after the event is to be snapshotted: every 'interval' events, so
+    that any state is at most that many events away from one, and after every shuffle"""
+    return event['command'] == Event.CMD_SHUFFLE or number % interval == 0
+
+
+def apply_event(engine, event):
+    """Plays the event on the engine"""
+    command = event['command']
+    players = engine.data['players']
+    player = players[0] if players[0]['pk'] == event['actor'] else players[1]
+    if command == Event.CMD_DRAW:
+        # a draw from an empty deck is recorded as an error, the board ends the game
+        if not event['error']:
+            gcard = player['deck'][event['gcard']]
+            engine.move_gcard(player, gcard, GameCard.SLOT_HAND, len(player['hand']))
+    elif command == Event.CMD_PLAY:
+        gcard = player['hand'][event['gcard']]
+        engine.move_gcard(player, gcard, GameCard.SLOT_TABLE, len(player['table']))
+        engine.set_player_value(player, 'last_turn_person', event['round'])
+    elif command not in (Event.CMD_STATUS, Event.CMD_PHASE, Event.CMD_PASS):
+        raise Exception('can not replay {} events'.format(command))
+
+    for field in engine.GAME_FIELDS:
+        if engine.data[field] != event[field]:
+            engine.set_game_value(field, event[field])
+    for player, key in zip(players, BOARD_HEALTH):
+        if player['health'] != event[key]:
+            engine.set_player_value(player, 'health', event[key])
+
+
+def iter_states(engine, events, start, get_snapshot):
+    """Plays the events on the engine, which is at state 'start', and yields the state
+    number and the engine after each. The engine is updated in place. At a shuffle the
+    engine continues from the data of 'get_snapshot(number)'."""
+    for number, event in enumerate(events, start + 1):
+        if event['command'] == Event.CMD_SHUFFLE:
+            engine.data = get_snapshot(number)
+            engine.init_state(engine.rng)
+        else:
+            apply_event(engine, event)
+        yield number, engine
@@ -0,0 +1,53 @@
+"""Compact serialization of the game data of the engine, stored as a single blob on the
+game. The blob is zlib compressed JSON of nested lists, its first item is the version of
+the layout. Blobs of an older version are upgraded when loaded."""
+import json
+import zlib
+
+from core.constants import GameCard
+
+VERSION = 1
+
+SLOTS = (GameCard.SLOT_DECK, GameCard.SLOT_HAND, GameCard.SLOT_TABLE, GameCard.SLOT_GRAVE)
+
+# version to a function upgrading a document of that version to the next version
+UPGRADES = {}
+
+
+def dumps(data):
+    """Version 1 layout: [version, pk, status, turn, round, phase, players], a player is
+    [pk, health, pool, last_turn_person, gcards] and a game card [pk, card_id, pos, slot
+    index, tapped]"""
+    players = []
+    for player in data['players']:
+        gcards = [
+            [gcard['pk'], gcard['card_id'], gcard['pos'], i, int(gcard['tapped'])]
+            for i, slot in enumerate(SLOTS) for gcard in player[slot].values()
+        ]
+        players.append([player['pk'], player['health'], player['pool'], player['last_turn_person'], gcards])
+    document = [VERSION, data['pk'], data['status'], data['turn'], data['round'], data['phase'], players]
+    return zlib.compress(json.dumps(document, separators=(',', ':')).encode())
+
+
+def loads(blob):
+    document = json.loads(zlib.decompress(bytes(blob)).decode())
+    version = document[0]
+    if version > VERSION:
+        raise Exception('unknown snapshot version {}'.format(version))
+    while version < VERSION:
+        document = UPGRADES[version](document)
+        version = document[0]
+
+    _, pk, status, turn, round_, phase, players = document
+    data = {'pk': pk, 'status': status, 'turn': turn, 'round': round_, 'phase': phase, 'players': []}
+    for player_pk, health, pool, last_turn_person, gcards in players:
+        player = {'pk': player_pk, 'health': health, 'pool': pool, 'last_turn_person': last_turn_person}
+        for slot in SLOTS:
+            player[slot] = {}
+        for gcard_pk, card_id, pos, slot_index, tapped in gcards:
+            slot = SLOTS[slot_index]
+            player[slot][gcard_pk] = {
+                'pk': gcard_pk, 'card_id': card_id, 'pos': pos, 'slot': slot, 'tapped': bool(tapped),
+            }
+        data['players'].append(player)
+    return data
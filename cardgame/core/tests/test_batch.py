@@ -0,0 +1,54 @@
+import numpy as np
+
+from core.batch import BatchSimulator, STATUS_DONE, ZONES
+from core.bot import Bot
+from core.constants import Game
+from core.engine import MonteCarloEngineProxy, Move
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+def play_engine_move(engine):
+    """Same policy as the simulator with person_chance 1"""
+    moves = engine.get_available_moves()
+    if engine.is_phase_main() and not moves:
+        moves = [Move(Move.TYPE_PASS)]
+    engine.apply_move(moves[0])
+
+
+def test_matches_engine():
+    sim = BatchSimulator(PERSONS + OPINIONS, games=20, seed=1, max_rounds=5, person_chance=1.0)
+    sim.setup()
+    engines = [MonteCarloEngineProxy(sim.to_data(game)) for game in range(sim.games)]
+
+    while sim.busy().any():
+        sim.step()
+        counts = sim.zone_counts()
+        for game, engine in enumerate(engines):
+            if engine.data['round'] > sim.max_rounds:
+                continue
+            play_engine_move(engine)
+            assert engine.data['phase'] == Game.PHASE_ORDER[sim.phase[game]]
+            assert engine.data['turn'] == sim.turn[game]
+            assert engine.data['round'] == sim.round[game]
+            for p, player in enumerate(engine.data['players']):
+                assert [len(player[zone]) for zone in ZONES] == list(counts[game, p])
+
+
+def test_evaluate():
+    sim = BatchSimulator(PERSONS + OPINIONS, games=20, seed=1, max_rounds=5)
+    sim.setup()
+    sim.run(max_steps=7)
+    values = sim.evaluate()
+    for game in range(sim.games):
+        bot = Bot(MonteCarloEngineProxy(sim.to_data(game)))
+        assert values[game] == bot._get_static_eval()
+
+
+def test_run():
+    sim = BatchSimulator(PERSONS + OPINIONS, games=100, seed=1, max_rounds=10)
+    sim.setup()
+    sim.run()
+    assert (sim.status == STATUS_DONE).all()
+    assert (sim.round == 11).all()
+    assert (sim.zone_counts().sum(axis=2) == 60).all()
+    assert set(np.unique(sim.winners())) <= {0, 1, 2}
@@ -0,0 +1,43 @@
+from core.bot import play_self_play_game
+from core.cache import PositionCache
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+def test_get_put(tmp_path):
+    path = str(tmp_path / 'positions.sqlite3')
+    with PositionCache(path) as cache:
+        assert cache.get(2 ** 64 - 1, 1) is None
+        cache.put(2 ** 64 - 1, 0.5, 2)
+        cache.put(7, 1.5, 1)
+        # shallower values do not replace deeper ones
+        cache.put(7, -1.0, 0)
+        assert cache.get(7, 1) == 1.5
+        assert cache.get(7, 2) is None
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 2
+
+    with PositionCache(path, readonly=True) as cache:
+        assert len(cache) == 2
+        assert cache.get(2 ** 64 - 1, 2) == 0.5
+        cache.put(8, 1.0, 5)
+        assert cache.get(8, 1) is None
+
+    with PositionCache(path) as cache:
+        cache.put(7, 2.5, 3)
+    with PositionCache(path) as cache:
+        assert cache.get(7, 3) == 2.5
+        assert cache.hit_rate() == 1.0
+
+
+def test_self_play_with_cache(tmp_path):
+    path = str(tmp_path / 'positions.sqlite3')
+    with PositionCache(path) as cache:
+        first = play_self_play_game(PERSONS, OPINIONS, seed=1, depth=2, max_rounds=3, position_cache=cache)
+    assert first['cache_hits'] == 0
+    assert first['cache_misses'] > 0
+
+    with PositionCache(path, readonly=True) as cache:
+        second = play_self_play_game(PERSONS, OPINIONS, seed=1, depth=2, max_rounds=3, position_cache=cache)
+    assert second['cache_hits'] > 0
+    for key in ('winner', 'moves', 'health1', 'health2'):
+        assert second[key] == first[key]
@@ -0,0 +1,18 @@
+from core import catalog
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+def test_register():
+    person, = catalog.register(PERSONS)
+    assert person.abilities == (('t', 'm1g'),)
+    assert catalog.get(person.pk) is person
+    # interned, registering again keeps the instance
+    assert catalog.register(PERSONS)[0] is person
+    assert catalog.register([person])[0] is person
+    assert catalog.missing({person.pk, OPINIONS[0]['pk']}) == {OPINIONS[0]['pk']}
+
+
+def test_register_changed_card():
+    catalog.register(PERSONS)
+    person, = catalog.register([dict(PERSONS[0], support=2)])
+    assert catalog.get(person.pk).support == 2
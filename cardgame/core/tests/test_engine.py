@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+from itertools import product
+from random import Random
+
+from core import catalog
+from core.bot import Bot, play_self_play_game
+from core.constants import Card, Game
+from core.engine import MonteCarloEngineProxy, Move, Zone, card_identity, create_random_data
+
+PERSONS = [{'pk': 1, 'kind': Card.KIND_PERSON, 'support': 0, 'abilities': [('t', 'm1g')], 'power': None,
+            'endurance': None}]
+OPINIONS = [
+    {'pk': pk, 'kind': Card.KIND_OPINION, 'support': 1, 'abilities': [], 'power': power, 'endurance': endurance}
+    for pk, (power, endurance) in enumerate(product(range(0, 6), range(1, 6)), 2)
+]
+
+
+def test_import_without_django_or_numpy():
+    code = 'import sys, core.bot; assert not [m for m in sys.modules if m.startswith(("django", "numpy"))]'
+    project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=project_dir)
+
+
+def test_play_in_memory():
+    data = create_random_data(PERSONS, OPINIONS, Random(1))
+    engine = MonteCarloEngineProxy(data, Random(1))
+    engine.setup_game()
+    assert engine.is_status_busy()
+    engine.apply_move(Move(Move.TYPE_DRAW))
+    assert len(engine.get_player()['hand']) == Game.START_DRAW_NUMBER + 1
+
+    best_value, best_moves = Bot(engine).analyze(2)
+    assert len(best_moves) == 1
+
+
+def test_zone():
+    zone = Zone.from_gcards([{'pk': 1, 'pos': 2}, {'pk': 2, 'pos': 1}])
+    assert list(zone) == [2, 1]
+    assert zone.top()['pk'] == 1
+    assert zone == {1: {'pk': 1, 'pos': 2}, 2: {'pk': 2, 'pos': 1}}
+    assert Zone().top() is None
+
+
+def test_card_identity():
+    person, plain, copy = catalog.register([
+        PERSONS[0], dict(PERSONS[0], pk=100, abilities=[]), dict(PERSONS[0], pk=101)])
+    assert card_identity(person) != card_identity(plain)
+    assert card_identity(person) == card_identity(copy)
+
+
+def test_draw_order():
+    engine = MonteCarloEngineProxy(create_random_data(PERSONS, OPINIONS, Random(1)), Random(1))
+    engine.setup_game()
+    player = engine.get_player()
+    top = player['deck'].top()
+    assert top['pos'] == max(gcard['pos'] for gcard in player['deck'].values())
+    undo = engine.apply_move(Move(Move.TYPE_DRAW))
+    assert top['pk'] in player['hand']
+    engine.undo_move(undo)
+    assert player['deck'].top() is top
+
+
+def test_draw_from_empty_deck():
+    engine = MonteCarloEngineProxy(create_random_data(PERSONS, OPINIONS, Random(1)), Random(1))
+    engine.setup_game()
+    player = engine.get_player()
+    for gcard in list(player['deck'].values()):
+        engine.move_gcard(player, gcard, 'grave', gcard['pos'])
+    assert engine.is_phase_draw()
+    bot = Bot(engine)
+    assert bot.analyze(2)[1][0].is_type_draw()
+    assert bot.root.children[0].game_over
+
+    undo = engine.apply_move(Move(Move.TYPE_DRAW))
+    assert engine.is_status_finished()
+    assert engine.is_phase_draw()
+    assert engine.get_available_moves() == []
+    engine.undo_move(undo)
+    assert engine.is_status_busy()
+
+
+def test_play_self_play_game():
+    result = play_self_play_game(PERSONS, OPINIONS, seed=1, max_rounds=2, record_events=True)
+    assert result['rounds'] == 2
+    assert result['moves'] > 0
+    assert result['events'][-1]['status'] == Game.STATUS_DONE
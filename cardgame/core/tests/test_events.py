@@ -0,0 +1,23 @@
+from random import Random
+
+from core import events
+from core.engine import MonteCarloEngineProxy, Move, create_random_data
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+def test_delta_round_trip():
+    engine = MonteCarloEngineProxy(create_random_data(PERSONS, OPINIONS, Random(1)), Random(1))
+    first = engine.get_board()
+    delta = events.encode_delta(first)
+    assert len(delta) == len(events.BOARD_FIELDS) * events.PAIR.size
+    assert events.apply_delta({}, delta) == first
+
+    engine.setup_game()
+    engine.apply_move(Move(Move.TYPE_DRAW))
+    board = engine.get_board()
+    delta = events.encode_delta(board, first)
+    assert len(delta) < len(events.BOARD_FIELDS) * events.PAIR.size
+    assert events.apply_delta(first, delta) == board
+
+    assert events.encode_delta(board, board) is None
+    assert events.apply_delta(board, None) == board
@@ -0,0 +1,44 @@
+from random import Random
+
+from core import replay, snapshot
+from core.engine import MonteCarloEngineProxy, RecordingEngineProxy, Move, create_random_data
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+class SnapshottingEngineProxy(RecordingEngineProxy):
+    """Recording engine that also keeps the snapshots of 'core.replay' and every state"""
+    INTERVAL = 7
+
+    def __init__(self, data, rng=None):
+        super().__init__(data, rng)
+        self.snapshots = {}
+        self.states = {}
+
+    def log(self, *args, **kwargs):
+        super().log(*args, **kwargs)
+        number = len(self.events)
+        if replay.needs_snapshot(number, self.events[-1], self.INTERVAL):
+            self.snapshots[number] = snapshot.dumps(self.data)
+        self.states[number] = snapshot.loads(snapshot.dumps(self.data))
+
+
+def test_iter_states():
+    rng = Random(3)
+    engine = SnapshottingEngineProxy(create_random_data(PERSONS, OPINIONS, rng), rng)
+    engine.setup_game()
+    while not engine.is_status_finished() and engine.data['round'] <= 10:
+        moves = engine.get_available_moves()
+        if engine.is_action_phase():
+            moves.append(Move(Move.TYPE_PASS))
+        engine.apply_move(rng.choice(moves))
+    assert len(engine.snapshots) > 2
+
+    start = min(engine.snapshots)
+    replayed = MonteCarloEngineProxy(snapshot.loads(engine.snapshots[start]))
+    numbers = []
+    for number, state in replay.iter_states(replayed, engine.events[start:], start,
+                                            lambda number: snapshot.loads(engine.snapshots[number])):
+        assert state.data == engine.states[number]
+        assert state.hash == state.compute_hash()
+        numbers.append(number)
+    assert numbers == list(range(start + 1, len(engine.events) + 1))
@@ -0,0 +1,31 @@
+from random import Random
+
+import pytest
+
+from core import snapshot
+from core.engine import MonteCarloEngineProxy, Move, create_random_data
+from core.tests.test_engine import OPINIONS, PERSONS
+
+
+def test_round_trip():
+    engine = MonteCarloEngineProxy(create_random_data(PERSONS, OPINIONS, Random(1)), Random(1))
+    engine.setup_game()
+    engine.apply_move(Move(Move.TYPE_DRAW))
+    blob = snapshot.dumps(engine.data)
+    assert isinstance(blob, bytes)
+    assert snapshot.loads(blob) == engine.data
+    assert MonteCarloEngineProxy(snapshot.loads(blob)).hash == engine.hash
+
+
+def test_upgrade(monkeypatch):
+    data = create_random_data(PERSONS, OPINIONS, Random(1))
+    blob = snapshot.dumps(data)
+    monkeypatch.setattr(snapshot, 'VERSION', 2)
+    with pytest.raises(KeyError):
+        snapshot.loads(blob)
+    monkeypatch.setattr(snapshot, 'UPGRADES', {1: lambda document: [2] + document[1:]})
+    assert snapshot.loads(blob) == data
+
+    monkeypatch.setattr(snapshot, 'VERSION', 0)
+    with pytest.raises(Exception):
+        snapshot.loads(blob)
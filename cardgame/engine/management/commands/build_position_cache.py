@@ -0,0 +1,53 @@
+import time
+from random import Random
+
+from django.core.management import BaseCommand
+
+from cards.models import Card
+from core.bot import play_self_play_pool
+from core.cache import PositionCache
+from engine.services import GameAdaptor
+
+
+class Command(BaseCommand):
+    help = 'Build a position cache for simulate --position-cache by playing self-play games'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='SQLite file of the cache, created if missing')
+        parser.add_argument('--games', type=int, default=100, help='number of self-play games to play')
+        parser.add_argument('--workers', type=int, default=1, help='worker processes')
+        parser.add_argument('--seed', type=int, help='seed of the self-play games')
+        parser.add_argument('--depth', type=int, default=1, help='bot search depth')
+        parser.add_argument('--max-rounds', type=int, default=30, help='rounds after which a game is over')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        games = options.get('games', 100)
+        workers = options.get('workers') or 1
+        self.stdout.write('Building position cache {} from {} games on {} workers...'.format(
+            path, games, workers))
+
+        cards = GameAdaptor().load_cards().values()
+        persons = [card for card in cards if card.kind == Card.KIND_PERSON]
+        opinions = [card for card in cards if card.kind == Card.KIND_OPINION]
+
+        # creates the file before the workers open it
+        with PositionCache(path) as position_cache:
+            size_before = len(position_cache)
+
+        rng = Random(options.get('seed'))
+        seeds = [rng.getrandbits(32) for _ in range(games)]
+        started = time.monotonic()
+        results = play_self_play_pool(
+            persons, opinions, seeds, workers, depth=options.get('depth', 1),
+            max_rounds=options.get('max_rounds', 30), cache_path=path, cache_readonly=False)
+        elapsed = time.monotonic() - started
+
+        with PositionCache(path, readonly=True) as position_cache:
+            size = len(position_cache)
+        hits = sum(result['cache_hits'] for result in results)
+        lookups = hits + sum(result['cache_misses'] for result in results)
+        self.stdout.write('{} positions added, {} in total, in {:.1f} sec'.format(
+            size - size_before, size, elapsed))
+        self.stdout.write('Position cache hit rate {:.1%} of {} lookups'.format(
+            hits / lookups if lookups else 0.0, lookups))
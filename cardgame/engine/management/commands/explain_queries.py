@@ -0,0 +1,88 @@
+import re
+import time
+from random import Random
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from cards.models import Card
+from engine.models import Event, Game, GameCard
+from engine.services import create_random_games
+
+# a table scan without an index, by SQLite ('SCAN TABLE x' before 3.36) and PostgreSQL
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\s*$|\bSeq Scan on (\w+)', re.MULTILINE)
+GAMECARDS_PER_GAME = 120
+
+
+def full_scans(plan):
+    """Tables the query plan scans in full"""
+    return [sqlite or postgres for sqlite, postgres in FULL_SCAN.findall(plan)]
+
+
+def hot_queries(game):
+    """The queries on the access paths of the games, named by where they run"""
+    player = game.player_set.order_by('pk').first()
+    return [
+        ('Player.deck', player.deck()),
+        ('Player.hand', player.hand()),
+        ('Player.table', player.table()),
+        ('Player.available_support', player.untapped_table_persons()),
+        ('GameAdaptor.to_dict', GameCard.objects.filter(player__game=game).order_by('player_id', 'pos')),
+        ('iter_wide_events', Event.objects.filter(game=game).order_by('seq')),
+        ('simulate unfinished game', Game.objects.exclude(status=Game.STATUS_DONE).order_by('pk')),
+        ('refresh_stale_rows', Game.objects.filter(rows_stale=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Explain the hot queries against a database of --gamecards game cards, fails on a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gamecards', type=int, default=1000000, help='number of game cards to create')
+        parser.add_argument('--seed', type=int, default=1, help='seed of the random decks')
+
+    def handle(self, *args, **options):
+        gamecards = options.get('gamecards', 1000000)
+        games = max(1, gamecards // GAMECARDS_PER_GAME)
+        failed = []
+        # the games only exist for the benchmark, they are rolled back
+        with transaction.atomic():
+            self.stdout.write('Creating {} games with {} game cards...'.format(games, games * GAMECARDS_PER_GAME))
+            game = self.populate(games, Random(options.get('seed', 1)))
+            for name, queryset in hot_queries(game):
+                plan = queryset.explain()
+                started = time.perf_counter()
+                list(queryset)
+                elapsed = time.perf_counter() - started
+                scans = full_scans(plan)
+                self.stdout.write('{} {:.2f} ms{}'.format(
+                    name, elapsed * 1000, ', full scan of {}'.format(', '.join(scans)) if scans else ''))
+                self.stdout.write(plan)
+                if scans:
+                    failed.append(name)
+            transaction.set_rollback(True)
+        if failed:
+            raise CommandError('Full table scan in {}'.format(', '.join(failed)))
+        self.stdout.write('No full table scans')
+
+    def populate(self, games, rng):
+        """Random games of which all but the last are done, as after a simulation, with a
+        table person and events in the last. Returns the last game."""
+        persons = list(Card.objects.filter(kind=Card.KIND_PERSON).values_list('pk', flat=True))
+        opinions = list(Card.objects.filter(kind=Card.KIND_OPINION).values_list('pk', flat=True))
+        if not persons or not opinions:
+            raise CommandError('No cards, create the standard cards first')
+        handles = create_random_games(games, persons, opinions, rng)
+        Game.objects.exclude(pk=handles[-1].game_id).update(status=Game.STATUS_DONE)
+        game = Game.objects.get(pk=handles[-1].game_id)
+        player_id = handles[-1].player_ids[0]
+        GameCard.objects.filter(player_id=player_id, card__kind=Card.KIND_PERSON, pos=1).update(
+            slot=GameCard.SLOT_TABLE)
+        Event.objects.bulk_create([
+            Event(game=game, seq=seq, code=Event.CMD_CODES[Event.CMD_PHASE], actor_id=player_id)
+            for seq in range(1, 101)
+        ])
+        # planner statistics, as on a database in use
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return game
@@ -1,17 +1,35 @@
+import json
+import time
+from random import Random
+
 from django.core.management import BaseCommand
+from django.db import transaction
 
 from cards.models import Card
-from engine.models import Game
-from engine.services import Bot, Engine, create_random_game
+from engine.models import Game, GameResult
+from core.bot import Bot, play_self_play_pool
+from engine.services import Engine, GameAdaptor, create_random_game
 
 
 class Command(BaseCommand):
-    help = 'Simulate a game'
+    help = 'Simulate a game, or a batch of self-play games with --games'
 
-    # def add_arguments(self, parser):
-    #     parser.add_argument('max_power', type=int)
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, help='number of self-play games to play in memory')
+        parser.add_argument('--workers', type=int, default=1, help='worker processes for self-play')
+        parser.add_argument('--seed', type=int, help='seed of the self-play games')
+        parser.add_argument('--depth', type=int, default=1, help='bot search depth')
+        parser.add_argument('--max-rounds', type=int, default=30, help='rounds after which a game is over')
+        parser.add_argument('--log-sample', type=float, default=0.0,
+                            help='fraction of the games of which the event log is kept')
+        parser.add_argument('--position-cache',
+                            help='SQLite file of search values to read, see build_position_cache')
 
     def handle(self, *args, **options):
+        if options.get('games'):
+            self.self_play(options)
+            return
+
         self.stdout.write('Running simulation...')
 
         self.stdout.write('Getting game...')
@@ -31,14 +49,56 @@ class Command(BaseCommand):
             self.stdout.write('First existing unfinished game retrieved')
 
         self.stdout.write('Creating engine...')
-        engine = Engine(game)
-        while not engine.is_status_finished():
-            if engine.is_status_setup():
-                self.stdout.write('Setting up game...')
-                engine.setup_game()
-            bot = Bot(engine)
-            best_eval, best_move = bot.analyze()
-            break
+        with Engine(game) as engine:
+            while not engine.is_status_finished():
+                if engine.is_status_setup():
+                    self.stdout.write('Setting up game...')
+                    engine.setup_game()
+                bot = Bot(engine)
+                best_eval, best_move = bot.analyze()
+                break
 
         self.stdout.write('Script ended')
 
+    def self_play(self, options):
+        games = options['games']
+        workers = options.get('workers') or 1
+        self.stdout.write('Running {} self-play games on {} workers...'.format(games, workers))
+
+        cards = GameAdaptor().load_cards().values()
+        persons = [card for card in cards if card.kind == Card.KIND_PERSON]
+        opinions = [card for card in cards if card.kind == Card.KIND_OPINION]
+
+        rng = Random(options.get('seed'))
+        seeds = [rng.getrandbits(32) for _ in range(games)]
+        kwargs = {
+            'depth': options.get('depth', 1),
+            'max_rounds': options.get('max_rounds', 30),
+            'log_sample': options.get('log_sample', 0.0),
+            'cache_path': options.get('position_cache'),
+        }
+
+        started = time.monotonic()
+        results = play_self_play_pool(persons, opinions, seeds, workers, **kwargs)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write('Saving results...')
+        game_results = []
+        cache_hits = cache_misses = 0
+        for result in results:
+            cache_hits += result.pop('cache_hits')
+            cache_misses += result.pop('cache_misses')
+            events = result.pop('events')
+            game_results.append(GameResult(events=json.dumps(events) if events else None, **result))
+        with transaction.atomic():
+            GameResult.objects.bulk_create(game_results, batch_size=500)
+
+        moves = sum(result.moves for result in game_results)
+        wins = [sum(1 for result in game_results if result.winner == winner) for winner in (1, 2, None)]
+        self.stdout.write('Player 1 won {}, player 2 won {}, {} undecided'.format(*wins))
+        self.stdout.write('{:.1f} games/sec, {:.1f} moves/sec'.format(
+            len(game_results) / elapsed, moves / elapsed))
+        if kwargs['cache_path']:
+            lookups = cache_hits + cache_misses
+            self.stdout.write('Position cache hit rate {:.1%} of {} lookups'.format(
+                cache_hits / lookups if lookups else 0.0, lookups))
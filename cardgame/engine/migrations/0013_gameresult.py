@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0012_auto_20181220_1010'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.BigIntegerField()),
+                ('winner', models.IntegerField(null=True)),
+                ('rounds', models.IntegerField()),
+                ('moves', models.IntegerField()),
+                ('health1', models.IntegerField()),
+                ('health2', models.IntegerField()),
+                ('events', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
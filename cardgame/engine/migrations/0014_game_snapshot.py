@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0013_gameresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='rows_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='snapshot',
+            field=models.BinaryField(null=True),
+        ),
+    ]
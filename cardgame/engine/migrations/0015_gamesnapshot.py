@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0014_game_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_number', models.IntegerField()),
+                ('state', models.BinaryField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='engine.game')),
+            ],
+            options={
+                'unique_together': {('game', 'event_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,172 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:56
+
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+# the delta encoding of 'core.events' at the time of this migration
+BOARD_FIELDS = (
+    'status', 'turn', 'round', 'phase',
+    'health1', 'deck1_size', 'hand1_size', 'grave1_size',
+    'health2', 'deck2_size', 'hand2_size', 'grave2_size',
+)
+ENUM_FIELDS = {
+    'status': ['setup', 'busy', 'done'],
+    'phase': ['draw', 'main', 'debate', 'upkeep'],
+}
+PAIR = struct.Struct('<Bh')
+
+WIDE_FIELDS = [
+    ('status', models.CharField(choices=[('setup', 'Setup'), ('busy', 'Busy'), ('done', 'Done')], max_length=20)),
+    ('turn', models.IntegerField()),
+    ('round', models.IntegerField()),
+    ('phase', models.CharField(
+        choices=[('draw', 'Draw'), ('main', 'Main'), ('debate', 'Debate'), ('upkeep', 'Upkeep')], max_length=20)),
+    ('health1', models.IntegerField()),
+    ('health2', models.IntegerField()),
+    ('deck1_size', models.IntegerField()),
+    ('deck2_size', models.IntegerField()),
+    ('hand1_size', models.IntegerField()),
+    ('hand2_size', models.IntegerField()),
+    ('grave1_size', models.IntegerField()),
+    ('grave2_size', models.IntegerField()),
+    ('command', models.CharField(choices=[
+        ('status', 'Status'), ('draw', 'Draw'), ('shuffle', 'Shuffle'), ('phase', 'Phase'), ('play', 'Play'),
+        ('cost', 'Cost'), ('benefit', 'Benefit')], max_length=250)),
+]
+CMD_ORDER = ['status', 'shuffle', 'draw', 'phase', 'pass', 'play', 'cost', 'benefit']
+
+
+def nullable(field):
+    _, _, args, kwargs = field.deconstruct()
+    return field.__class__(*args, null=True, **kwargs)
+
+
+def encode_delta(board, previous=None):
+    pairs = []
+    for i, field in enumerate(BOARD_FIELDS):
+        value = board[field]
+        if previous is not None and previous[field] == value:
+            continue
+        if field in ENUM_FIELDS:
+            value = ENUM_FIELDS[field].index(value)
+        pairs.append(PAIR.pack(i, value))
+    return b''.join(pairs) or None
+
+
+def apply_delta(board, delta):
+    board = dict(board)
+    if delta:
+        for i, value in PAIR.iter_unpack(bytes(delta)):
+            field = BOARD_FIELDS[i]
+            if field in ENUM_FIELDS:
+                value = ENUM_FIELDS[field][value]
+            board[field] = value
+    return board
+
+
+def iter_game_events(Event):
+    """The events of every game in order, a list per game. The games are read one by one, as
+    SQLite does not isolate a read in batches from the updates in between."""
+    game_ids = list(Event.objects.order_by('game_id').values_list('game_id', flat=True).distinct())
+    for game_id in game_ids:
+        yield list(Event.objects.filter(game_id=game_id).order_by('pk'))
+
+
+def compact_events(apps, schema_editor):
+    """Numbers the events per game and replaces their board with the delta to the previous event"""
+    Event = apps.get_model('engine', 'Event')
+    batch = []
+    for events in iter_game_events(Event):
+        previous = None
+        for seq, event in enumerate(events, 1):
+            board = {field: getattr(event, field) for field in BOARD_FIELDS}
+            event.seq = seq
+            event.code = CMD_ORDER.index(event.command)
+            event.delta = encode_delta(board, previous)
+            previous = board
+        batch.extend(events)
+        if len(batch) >= BATCH_SIZE:
+            Event.objects.bulk_update(batch, ['seq', 'code', 'delta'])
+            batch = []
+    Event.objects.bulk_update(batch, ['seq', 'code', 'delta'])
+
+
+def expand_events(apps, schema_editor):
+    """Writes the whole board and the command of every event again"""
+    Event = apps.get_model('engine', 'Event')
+    fields = list(BOARD_FIELDS) + ['command']
+    batch = []
+    for events in iter_game_events(Event):
+        board = {}
+        for event in events:
+            board = apply_delta(board, event.delta)
+            for field, value in board.items():
+                setattr(event, field, value)
+            event.command = CMD_ORDER[event.code]
+        batch.extend(events)
+        if len(batch) >= BATCH_SIZE:
+            Event.objects.bulk_update(batch, fields)
+            batch = []
+    Event.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0015_gamesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seq',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='code',
+            field=models.PositiveSmallIntegerField(choices=[
+                (0, 'status'), (1, 'shuffle'), (2, 'draw'), (3, 'phase'), (4, 'pass'), (5, 'play'), (6, 'cost'),
+                (7, 'benefit')], null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='delta',
+            field=models.BinaryField(null=True),
+        ),
+    ] + [
+        # the wide columns are nullable while the data moves, so that this migration can be reversed
+        migrations.AlterField(model_name='event', name=name, field=nullable(field))
+        for name, field in WIDE_FIELDS
+    ] + [
+        migrations.RunPython(compact_events, expand_events),
+    ] + [
+        migrations.RemoveField(model_name='event', name=name)
+        for name, _ in WIDE_FIELDS
+    ] + [
+        migrations.AlterField(
+            model_name='event',
+            name='seq',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='code',
+            field=models.PositiveSmallIntegerField(choices=[
+                (0, 'status'), (1, 'shuffle'), (2, 'draw'), (3, 'phase'), (4, 'pass'), (5, 'play'), (6, 'cost'),
+                (7, 'benefit')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='event',
+            unique_together={('game', 'seq')},
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='game',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='engine.game'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0003_auto_20181202_0056'),
+        ('engine', '0016_compact_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamecard',
+            name='player',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='engine.player'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['id'], name='game_unfinished'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('rows_stale', True)), fields=['id'], name='game_rows_stale'),
+        ),
+        migrations.AddIndex(
+            model_name='gamecard',
+            index=models.Index(fields=['player', 'slot', 'pos'], name='gamecard_player_slot_pos'),
+        ),
+    ]
@@ -3,54 +3,39 @@ from random import shuffle
 from django.db import models
 
 from cards.models import Card, Ability
+from core import constants
 
 
-class Game(models.Model):
-    START_DRAW_NUMBER = 7
-
-    STATUS_SETUP = 'setup'
-    STATUS_BUSY = 'busy'
-    STATUS_DONE = 'done'
-    STATUS_CHOICES = (
-        (STATUS_SETUP, 'Setup'),
-        (STATUS_BUSY, 'Busy'),
-        (STATUS_DONE, 'Done'),
-    )
-    STATUS_ORDER = [
-        STATUS_SETUP, STATUS_BUSY, STATUS_DONE
-    ]
-
-    PHASE_DRAW = 'draw'
-    PHASE_MAIN = 'main'
-    PHASE_DEBATE = 'debate'
-    PHASE_UPKEEP = 'upkeep'
-    PHASE_CHOICES = (
-        (PHASE_DRAW, 'Draw'),
-        (PHASE_MAIN, 'Main'),
-        (PHASE_DEBATE, 'Debate'),
-        (PHASE_UPKEEP, 'Upkeep'),
-    )
-    PHASE_ORDER = [
-        PHASE_DRAW, PHASE_MAIN, PHASE_DEBATE, PHASE_UPKEEP
-    ]
-
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_SETUP, null=False)
+class Game(constants.Game, models.Model):
+    status = models.CharField(max_length=20, choices=constants.Game.STATUS_CHOICES,
+                              default=constants.Game.STATUS_SETUP, null=False)
     started_at = models.DateTimeField(auto_now_add=True, null=False)
     turn = models.IntegerField(default=1, null=False)
     round = models.IntegerField(default=1, null=False)
-    phase = models.CharField(max_length=20, choices=PHASE_CHOICES, default=PHASE_DRAW, null=False)
+    phase = models.CharField(max_length=20, choices=constants.Game.PHASE_CHOICES,
+                             default=constants.Game.PHASE_DRAW, null=False)
     last_combat_actor = models.IntegerField(null=True)
+    # whole game state as a 'core.snapshot' blob, then the player and game card rows are
+    # only a view of it, stale until refreshed
+    snapshot = models.BinaryField(null=True, editable=False)
+    rows_stale = models.BooleanField(default=False, null=False)
+
+    class Meta:
+        indexes = [
+            # the few unfinished games, e.g. for simulate to continue one
+            models.Index(fields=['id'], condition=~models.Q(status=constants.Game.STATUS_DONE),
+                         name='game_unfinished'),
+            models.Index(fields=['id'], condition=models.Q(rows_stale=True), name='game_rows_stale'),
+        ]
 
     def __str__(self):
         return 'id={} status={} round={} turn={} phase={} started_at={}'.format(
             self.pk, self.status, self.round, self.turn, self.phase, self.started_at)
 
 
-class Player(models.Model):
-    BELIEVE_START = 20
-
+class Player(constants.Player, models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, null=False)
-    belief = models.IntegerField(default=BELIEVE_START)
+    belief = models.IntegerField(default=constants.Player.BELIEVE_START)
     crowd = models.IntegerField(default=0, null=False)
     last_turn_person = models.IntegerField(default=0, null=False)
 
@@ -75,18 +60,18 @@ class Player(models.Model):
     def table_size(self):
         return self.gamecard_set.filter(slot=GameCard.SLOT_TABLE).count()
 
-    def available_support(self):
-        on_table = self.gamecard_set.filter(
+    def untapped_table_persons(self):
+        return self.gamecard_set.filter(
             slot=GameCard.SLOT_TABLE).filter(
             tapped=False).filter(
-            card__kind=Card.KIND_PERSON).count()
+            card__kind=Card.KIND_PERSON)
+
+    def available_support(self):
+        on_table = self.untapped_table_persons().count()
         return self.crowd + on_table
 
     def get_any_untapped_persons(self):
-        return self.gamecard_set.filter(
-            slot=GameCard.SLOT_TABLE).filter(
-            tapped=False).filter(
-            card__kind=Card.KIND_PERSON).get()
+        return self.untapped_table_persons().get()
 
 
 class DeckCardGameManager(models.Manager):
@@ -94,28 +79,22 @@ class DeckCardGameManager(models.Manager):
         return super().get_queryset().filter(slot=GameCard.SLOT_DECK)
 
 
-class GameCard(models.Model):
-    SLOT_DECK = 'deck'
-    SLOT_HAND = 'hand'
-    SLOT_TABLE = 'table'
-    SLOT_GRAVE = 'grave'
-    SLOT_CHOICES = (
-        (SLOT_DECK, 'Deck'),
-        (SLOT_HAND, 'Hand'),
-        (SLOT_TABLE, 'Table'),
-        (SLOT_GRAVE, 'Graveyard'),
-    )
-
+class GameCard(constants.GameCard, models.Model):
     # deck = DeckCardGameManager()
 
-    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    # the (player, slot, pos) index serves the lookups by player
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, db_index=False)
     card = models.ForeignKey(Card, on_delete=models.CASCADE)
     pos = models.IntegerField(null=False)
-    slot = models.CharField(max_length=10, choices=SLOT_CHOICES, null=False, blank=False)
+    slot = models.CharField(max_length=10, choices=constants.GameCard.SLOT_CHOICES, null=False, blank=False)
     tapped = models.BooleanField(default=False, null=False)
 
     class Meta:
         ordering = ['pos']
+        indexes = [
+            # the zones of a player in order
+            models.Index(fields=['player', 'slot', 'pos'], name='gamecard_player_slot_pos'),
+        ]
 
     def is_affordable(self):
         cost = self.card.support
@@ -127,51 +106,49 @@ class GameCard(models.Model):
         return False
 
 
-class Event(models.Model):
-    CMD_STATUS = 'status'
-    CMD_SHUFFLE = 'shuffle'
-    CMD_DRAW = 'draw'
-    CMD_PHASE = 'phase'
-    CMD_PASS = 'pass'
-    CMD_PLAY = 'play'
-    CMD_COST = 'cost'
-    CMD_BENEFIT = 'benefit'
-    CMD_CHOICES = (
-        (CMD_STATUS, 'Status'),
-        (CMD_DRAW, 'Draw'),
-        (CMD_SHUFFLE, 'Shuffle'),
-        (CMD_PHASE, 'Phase'),
-        (CMD_PLAY, 'Play'),
-        (CMD_COST, 'Cost'),
-        (CMD_BENEFIT, 'Benefit'),
-    )
-
-    # game data
-    game = models.ForeignKey(Game, on_delete=models.CASCADE, null=False)
-    status = models.CharField(max_length=20, choices=Game.STATUS_CHOICES, null=False)
-    turn = models.IntegerField(null=False)
-    round = models.IntegerField(null=False)
-    phase = models.CharField(max_length=20, choices=Game.PHASE_CHOICES, null=False)
-    # player data
-    health1 = models.IntegerField(null=False)
-    health2 = models.IntegerField(null=False)
-    deck1_size = models.IntegerField(null=False)
-    deck2_size = models.IntegerField(null=False)
-    hand1_size = models.IntegerField(null=False)
-    hand2_size = models.IntegerField(null=False)
-    grave1_size = models.IntegerField(null=False)
-    grave2_size = models.IntegerField(null=False)
-    # event data
+class Event(constants.Event, models.Model):
+    """An event only stores the board fields that changed since the previous event of the
+    game as a 'core.events' delta, 'iter_wide_events' rebuilds the whole board"""
+    # the unique (game, seq) index serves the lookups by game
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, null=False, db_index=False)
+    # number of the event in its game, from 1
+    seq = models.PositiveIntegerField(null=False)
+    code = models.PositiveSmallIntegerField(choices=constants.Event.CMD_CODE_CHOICES, null=False)
     occurred_at = models.DateTimeField(auto_now_add=True, null=False)
     actor = models.ForeignKey(Player, on_delete=models.CASCADE, null=False)
-    command = models.CharField(max_length=250, choices=CMD_CHOICES, null=False)
     gcard = models.ForeignKey(GameCard, on_delete=models.CASCADE, null=True)
     ability = models.ForeignKey(Ability, on_delete=models.CASCADE, null=True)
     error = models.BooleanField(default=False, null=False)
     comment = models.CharField(max_length=250, null=True)
+    delta = models.BinaryField(null=True)
+
+    class Meta:
+        unique_together = ('game', 'seq')
 
+    @property
+    def command(self):
+        return self.CMD_ORDER[self.code]
 
 
+class GameSnapshot(models.Model):
+    """State of a game after a number of its events as a 'core.snapshot' blob, to replay
+    the events from, see 'core.replay'"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, null=False)
+    event_number = models.IntegerField(null=False)
+    state = models.BinaryField(null=False)
 
+    class Meta:
+        unique_together = ('game', 'event_number')
 
 
+class GameResult(models.Model):
+    """Outcome of a game played in memory by the self-play simulation"""
+    seed = models.BigIntegerField(null=False)
+    winner = models.IntegerField(null=True)
+    rounds = models.IntegerField(null=False)
+    moves = models.IntegerField(null=False)
+    health1 = models.IntegerField(null=False)
+    health2 = models.IntegerField(null=False)
+    # json list of the events, only kept for a sample of the games
+    events = models.TextField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
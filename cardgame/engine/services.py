@@ -1,17 +1,71 @@
+import random
+from collections import namedtuple
 from copy import deepcopy
-from random import choice, shuffle
 
-from treelib import Tree
+from django.db import transaction
+from django.db.models import Max
 
-from cards.models import Ability, Card
-from engine.models import Event, Game, GameCard
+from cards.models import Card
+from core import catalog
+from core import engine as core_engine
+from core import events as core_events
+from core import replay, snapshot
+from core.engine import GameState
+from engine.models import Event, Game, GameCard, GameSnapshot, Player
 
 
-class GameAdaptor:
+class GameAdaptor(GameState):
     """Adaptor to make it easier to read the state. It converts the state from models
-    to a dictionary and stores it in 'data'. It also has helpers to read the state."""
-    
+    to a dictionary and stores it in 'data'. It also has helpers to read the state.
+
+    Changes are not written immediately: saving marks the game fields and game cards
+    as dirty and buffers events, and 'flush' writes them back in one transaction.
+
+    In snapshot mode the whole state is stored as one blob on the game, see
+    'core.snapshot', and a flush is a single update of the game. The player and game card
+    rows are then a view that is only written by 'refresh_rows'. A game that has a
+    snapshot is always loaded from it and kept in snapshot mode."""
+    GCARD_FIELDS = ('pos', 'slot', 'tapped')
+    # player data keys to model fields
+    PLAYER_FIELDS = {'health': 'belief', 'pool': 'crowd', 'last_turn_person': 'last_turn_person'}
+    EVENT_BUFFER_SIZE = 500
+    # a replay snapshot of the state is kept every so many events, see 'core.replay'
+    SNAPSHOT_INTERVAL = 100
+
+    def __init__(self, snapshot=False):
+        self.data = None
+        self.snapshot_mode = snapshot
+        self._saved_game = {}
+        self._dirty_game_fields = set()
+        self._dirty_gcards = {}
+        self._dirty_players = {}
+        self._events = []
+        self._snapshots = []
+        # sequence number and board of the last event of the game, the number is looked up
+        # on the first event logged, which stores the whole board
+        self._event_number = None
+        self._board = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def to_dict(self, game):
+        """Loads the game with a fixed number of queries: the players, their game cards
+        and the card catalog, which is resolved in memory. A snapshot needs no queries
+        but for the cards missing from the catalog."""
+        if game.snapshot is not None:
+            self.snapshot_mode = True
+            self.data = snapshot.loads(game.snapshot)
+            self.load_cards(catalog.missing({
+                gcard['card_id'] for player in self.data['players'] for slot in snapshot.SLOTS
+                for gcard in player[slot].values()
+            }))
+            self.mark_saved()
+            return
+
         self.data = {
             'pk': game.pk,
             'status': game.status,
@@ -20,7 +74,8 @@ class GameAdaptor:
             'phase': game.phase,
             'players': [],
         }
-        for player in game.player_set.all():
+        players = {}
+        for player in game.player_set.order_by('pk'):
             player_item = {
                 'pk': player.pk,
                 'health': player.belief,
@@ -31,562 +86,305 @@ class GameAdaptor:
                 'table': {},
                 'grave': {},
             }
-            for gcard in player.gamecard_set.all():
-                card = {
-                    'kind': gcard.card.kind,
-                    'support': gcard.card.support,
-                    'abilities': [],
-                    'power': gcard.card.power,
-                    'endurance': gcard.card.endurance,
-                }
-                gcard_item = {
-                    'pk': gcard.pk,
-                    'card': card,
-                    'pos': gcard.pos,
-                    'slot': gcard.slot,
-                    'tapped': gcard.tapped,
-                }
-                player_item[gcard.slot][gcard.pk] = gcard_item
+            players[player.pk] = player_item
             self.data['players'].append(player_item)
 
-    def save_game(self):
-        game = Game.objects.get(pk=self.data['pk'])
-        game.status = self.data['status']
-        game.turn = self.data['turn']
-        game.round = self.data['round']
-        game.phase = self.data['phase']
-        game.save()
-
-    def save_gcard(self, gcard_data):
-        gcard = GameCard.objects.get(pk=gcard_data['pk'])
-        gcard.pos = gcard_data['pos']
-        gcard.slot = gcard_data['slot']
-        gcard.tapped = gcard_data['tapped']
-        gcard.save()
-
-    ##############################
-    # Game helpers
-    ##############################
-    
-    def is_status_setup(self):
-        return self.data['status'] == Game.STATUS_SETUP
-
-    def is_status_busy(self):
-        return self.data['status'] == Game.STATUS_BUSY
-
-    def is_status_finished(self):
-        return self.data['status'] == Game.STATUS_DONE
-
-    def is_phase_draw(self):
-        return self.data['phase'] == Game.PHASE_DRAW
-
-    def is_phase_main(self):
-        return self.data['phase'] == Game.PHASE_MAIN
-
-    def is_phase_debate(self):
-        return self.data['phase'] == Game.PHASE_DEBATE
-
-    def is_action_phase(self):
-        return self.data['phase'] in [Game.PHASE_MAIN, Game.PHASE_DEBATE]
-
-    def is_phase_upkeep(self):
-        return self.data['phase'] == Game.PHASE_UPKEEP
-
-    def get_player(self, active=True):
-        i = self.data['turn'] - 1
-        if not active:
-            i = not i
-        return self.data['players'][i]
-
-    ##############################
-    # Player helpers
-    ##############################
+        gcards = list(GameCard.objects.filter(player__game=game).order_by('player_id', 'pos').values_list(
+            'pk', 'player_id', 'card_id', 'pos', 'slot', 'tapped'))
+        self.load_cards(catalog.missing({card_id for _, _, card_id, _, _, _ in gcards}))
+
+        for pk, player_pk, card_id, pos, slot, tapped in gcards:
+            gcard_item = {
+                'pk': pk,
+                'card_id': card_id,
+                'pos': pos,
+                'slot': slot,
+                'tapped': tapped,
+            }
+            players[player_pk][slot][pk] = gcard_item
+        self.mark_saved()
+
+    def load_cards(self, card_ids=None):
+        """Loads cards with their abilities into the card catalog and returns them keyed by
+        pk, all cards if no ids are given"""
+        if card_ids is not None and not card_ids:
+            return {}
+        cards = Card.objects.all() if card_ids is None else Card.objects.filter(pk__in=card_ids)
+        abilities = Card.abilities.through.objects.all()
+        if card_ids is not None:
+            abilities = abilities.filter(card_id__in=card_ids)
+
+        card_abilities = {}
+        for card_id, cost, benefit in abilities.values_list('card_id', 'ability__cost', 'ability__benefit'):
+            card_abilities.setdefault(card_id, []).append((cost, benefit))
+        cards = catalog.register(
+            {'pk': pk, 'kind': kind, 'support': support, 'power': power, 'endurance': endurance,
+             'abilities': card_abilities.get(pk, [])}
+            for pk, kind, support, power, endurance in cards.values_list(
+                'pk', 'kind', 'support', 'power', 'endurance')
+        )
+        return {card.pk: card for card in cards}
 
-    def has_played_person(self, active=True):
-        player = self.get_player(active)
-        return player['last_turn_person'] == self.data['turn']
+    def mark_saved(self):
+        """Current state is what is stored"""
+        self._saved_game = {field: self.data[field] for field in self.GAME_FIELDS}
+        self._dirty_game_fields = set()
+        self._dirty_gcards = {}
+        self._dirty_players = {}
 
-    def get_hand_persons(self, active=True):
-        player = self.get_player(active)
-        persons = [gc for gc in player['hand'].values() if gc['card']['kind'] == Card.KIND_PERSON]
-        return persons
+    def save_game(self):
+        for field in self.GAME_FIELDS:
+            if self.data[field] != self._saved_game.get(field):
+                self._dirty_game_fields.add(field)
 
-    def get_table_opinions(self, active=True, untapped=False):
-        player = self.get_player(active)
-        opinions = [gc for gc in player['table'] if gc['card']['kind'] == Card.KIND_OPINION]
-        if untapped:
-            opinions = [gc for gc in opinions if not gc['tapped']]
-        return opinions
+    def save_gcard(self, gcard_data):
+        self._dirty_gcards[gcard_data['pk']] = gcard_data
+
+    def save_player(self, player_data):
+        self._dirty_players[player_data['pk']] = player_data
+
+    def save_event(self, event):
+        if self._event_number is None:
+            self._event_number = Event.objects.filter(game_id=self.data['pk']).aggregate(Max('seq'))['seq__max'] or 0
+        self._event_number += 1
+        event.seq = self._event_number
+        self._events.append(event)
+        event_dict = {'command': event.command}
+        if replay.needs_snapshot(self._event_number, event_dict, self.SNAPSHOT_INTERVAL):
+            self._snapshots.append(GameSnapshot(
+                game_id=self.data['pk'], event_number=self._event_number, state=snapshot.dumps(self.data)))
+        if len(self._events) >= self.EVENT_BUFFER_SIZE:
+            self.flush()
+
+    def is_dirty(self):
+        return bool(self._dirty_game_fields or self._dirty_gcards or self._dirty_players or self._events or
+                    self._snapshots)
+
+    def flush(self):
+        """Writes the dirty game fields, players, game cards and buffered events in a single transaction"""
+        if not self.is_dirty():
+            return
+        with transaction.atomic():
+            if self.snapshot_mode:
+                fields = {field: self.data[field] for field in self.GAME_FIELDS}
+                Game.objects.filter(pk=self.data['pk']).update(
+                    snapshot=snapshot.dumps(self.data), rows_stale=True, **fields)
+            else:
+                self._flush_rows()
+            if self._events:
+                Event.objects.bulk_create(self._events)
+            if self._snapshots:
+                GameSnapshot.objects.bulk_create(self._snapshots)
+        self.mark_saved()
+        self._events = []
+        self._snapshots = []
+
+    def _flush_rows(self):
+        if self._dirty_game_fields:
+            fields = {field: self.data[field] for field in self._dirty_game_fields}
+            Game.objects.filter(pk=self.data['pk']).update(**fields)
+        if self._dirty_gcards:
+            gcards = [
+                GameCard(pk=gcard['pk'], pos=gcard['pos'], slot=gcard['slot'], tapped=gcard['tapped'])
+                for gcard in self._dirty_gcards.values()
+            ]
+            GameCard.objects.bulk_update(gcards, self.GCARD_FIELDS)
+        if self._dirty_players:
+            players = [
+                Player(pk=player['pk'], **{field: player[key] for key, field in self.PLAYER_FIELDS.items()})
+                for player in self._dirty_players.values()
+            ]
+            Player.objects.bulk_update(players, self.PLAYER_FIELDS.values())
+
+    def refresh_rows(self):
+        """Writes the whole state to the game, player and game card rows, e.g. to bring the
+        rows of a game in snapshot mode up to date"""
+        self.flush()
+        with transaction.atomic():
+            fields = {field: self.data[field] for field in self.GAME_FIELDS}
+            Game.objects.filter(pk=self.data['pk']).update(rows_stale=False, **fields)
+            gcards = [
+                GameCard(pk=gcard['pk'], pos=gcard['pos'], slot=gcard['slot'], tapped=gcard['tapped'])
+                for player in self.data['players'] for slot in snapshot.SLOTS for gcard in player[slot].values()
+            ]
+            GameCard.objects.bulk_update(gcards, self.GCARD_FIELDS, batch_size=500)
+            players = [
+                Player(pk=player['pk'], **{field: player[key] for key, field in self.PLAYER_FIELDS.items()})
+                for player in self.data['players']
+            ]
+            Player.objects.bulk_update(players, self.PLAYER_FIELDS.values())
+
+    def close(self):
+        self.flush()
+
+
+class Engine(GameAdaptor, core_engine.Engine):
+    """Engine on a game in the database, or on game data"""
+
+    def __init__(self, game_or_data, rng=None, snapshot=False):
+        GameAdaptor.__init__(self, snapshot)
+        if isinstance(game_or_data, Game):
+            self._game = game_or_data
+            self.to_dict(game_or_data)
+        else:
+            self._game = None
+            self.data = deepcopy(game_or_data)
+            self.mark_saved()
+        self.init_state(rng)
 
-    ##############################
-    # GameCard helpers
-    ##############################
+    def __repr__(self):
+        return '{}(_game={})'.format(self.__class__.__name__, bool(self._game))
 
+    def log(self, actor_pk, cmd, gcard_pk=None, error=False, comment=None):
+        board = self.get_board()
+        event = Event(
+            game_id=self.data['pk'], code=Event.CMD_CODES[cmd], actor_id=actor_pk, gcard_id=gcard_pk,
+            error=error, comment=comment, delta=core_events.encode_delta(board, self._board)
+        )
+        self._board = board
+        self.save_event(event)
+
+
+def iter_wide_events(game, start=0, stop=None, board=None, chunk_size=1000):
+    """Read side view of the events of the game in the shape of the former wide event rows:
+    dicts of the event fields and the whole board. Yields the events after number 'start' up
+    to number 'stop'. The board is rebuilt from the deltas of the events before, or from
+    'board', the board of event 'start'."""
+    events = Event.objects.filter(game=game)
+    if stop is not None:
+        events = events.filter(seq__lte=stop)
+    if board is not None:
+        events = events.filter(seq__gt=start)
+    else:
+        board = {}
+    events = events.order_by('seq').values_list(
+        'seq', 'code', 'occurred_at', 'actor_id', 'gcard_id', 'ability_id', 'error', 'comment', 'delta')
+    for seq, code, occurred_at, actor_id, gcard_id, ability_id, error, comment, delta in events.iterator(
+            chunk_size=chunk_size):
+        board = core_events.apply_delta(board, delta)
+        if seq <= start:
+            continue
+        yield dict(
+            game_id=game.pk, seq=seq, command=Event.CMD_ORDER[code], occurred_at=occurred_at, actor_id=actor_id,
+            gcard_id=gcard_id, ability_id=ability_id, error=error, comment=comment, **board
+        )
 
-class Move:
-    TYPE_PASS = 'pass'
-    TYPE_PERSON = 'person'
-    TYPE_DRAW = 'draw'
 
-    def __init__(self, type_, gcard=None):
-        self.type_ = type_
-        self.gcard = gcard
+class GameReplay:
+    """Rebuilds the states of a game from its events, starting at the nearest snapshot,
+    see 'core.replay'. Any state is at most 'GameAdaptor.SNAPSHOT_INTERVAL' events away
+    from a snapshot. State number n is the state after the event with sequence number n."""
 
-    def __repr__(self):
-        return '{}({})'.format(self.__class__.__name__, self.type_)
+    def __init__(self, game):
+        self.game = game
 
-    def is_type_pass(self):
-        return self.type_ == self.TYPE_PASS
+    def __len__(self):
+        return Event.objects.filter(game=self.game).aggregate(Max('seq'))['seq__max'] or 0
 
-    def is_type_person(self):
-        return self.type_ == self.TYPE_PERSON
+    def get_snapshot(self, number):
+        state = GameSnapshot.objects.values_list('state', flat=True).get(game=self.game, event_number=number)
+        return snapshot.loads(state)
 
-    def is_type_draw(self):
-        return self.type_ == self.TYPE_DRAW
+    def get_events(self, engine, start, stop=None):
+        """Events after state 'start' up to state 'stop' as dicts for 'core.replay', the
+        engine is at state 'start'"""
+        for event in iter_wide_events(self.game, start, stop, engine.get_board()):
+            event['actor'] = event.pop('actor_id')
+            event['gcard'] = event.pop('gcard_id')
+            yield event
 
+    def state_at(self, number):
+        """Engine with the state after 'number' events"""
+        start, state = (
+            GameSnapshot.objects.filter(game=self.game, event_number__lte=number)
+            .order_by('-event_number').values_list('event_number', 'state').first()
+            or (None, None)
+        )
+        if start is None:
+            raise Exception('no snapshot of game {} at or before event {}'.format(self.game.pk, number))
+        engine = core_engine.MonteCarloEngineProxy(snapshot.loads(state))
+        if number > start:
+            for _ in replay.iter_states(engine, self.get_events(engine, start, number), start, self.get_snapshot):
+                pass
+        return engine
 
-class Engine(GameAdaptor):
+    def iter_states(self, start=None, stop=None):
+        """Streams the states from the first snapshot, or from state 'start', to state
+        'stop' or the last state. Yields the state number and an engine, which is updated
+        in place."""
+        if start is None:
+            start = GameSnapshot.objects.filter(game=self.game).order_by('event_number').values_list(
+                'event_number', flat=True).first()
+            if start is None:
+                return
+        engine = self.state_at(start)
+        yield start, engine
+        yield from replay.iter_states(engine, self.get_events(engine, start, stop), start, self.get_snapshot)
 
-    def __init__(self, game_or_data):
-        if isinstance(game_or_data, Game):
-            self._game = game_or_data
-            self.to_dict(game_or_data)
-        else:
-            self._game = None
-            self.data = deepcopy(game_or_data)
 
-    def __repr__(self):
-        return '{}(_game={})'.format(self.__class__.__name__, bool(self.__game))
-
-    def setup_game(self):
-        for player in self.data['players']:
-            self.shuffle_deck(player)
-            self.draw(player, Game.START_DRAW_NUMBER)
-        self.next_status()
-
-    def shuffle_deck(self, player):
-        # randomizes the deck dictionary
-        gcards = list(player['deck'].values())
-        shuffle(gcards)
-        player['deck'] = {}
-        for i, gcard in enumerate(gcards):
-            gcard['pos'] = i + 1
-            self.save_gcard(gcard)
-            player['deck'][gcard['pk']] = gcard
-        self.log(player['pk'], Event.CMD_SHUFFLE)
-
-    def draw(self, player, qty):
-        # top card located at end of list, as first card on deck to draw
-        # move from deck to hand
-        hand_size = len(player['hand'])
-        for i in range(qty):
-            gcard = list(player['deck'].values()).pop()  # <-- handle if empty!
-            gcard['slot'] = GameCard.SLOT_HAND
-            gcard['pos'] = hand_size + i
-            del player['deck'][gcard['pk']]
-            player['hand'][gcard['pk']] = gcard
-            self.save_gcard(gcard)
-            self.log(player['pk'], Event.CMD_DRAW, gcard['pk'])
-
-    def next_status(self):
-        i = Game.STATUS_ORDER.index(self.data['status'])
-        new_status = Game.STATUS_ORDER[i + 1]
-        self.data['status'] = new_status
-        self.save_game()
-        self.log(self.get_player(True)['pk'], Event.CMD_STATUS)
-
-    def next_phase(self):
-        i = Game.PHASE_ORDER.index(self.data['phase'])
-        try:
-            new_phase = Game.PHASE_ORDER[i + 1]
-        except IndexError:
-            new_phase = Game.PHASE_ORDER[0]
-            # round increases only after player 2 finished
-            self.data['round'] += 1 if self.data['turn'] == 2 else 0
-            self.data['turn'] = 2 if self.data['turn'] == 1 else 1
-        self.data['phase'] = new_phase
-        self.save_game()
-        self.log(self.get_player()['pk'], Event.CMD_PHASE)
-
-        # auto continue phase if no moves available
-        moves = self.get_available_moves()
-        if not moves:
-            self.next_phase()
-
-    def get_available_moves(self):
-        """get moves but for new moves the action has to have been taken on the engine copy"""
-        moves = []
-
-        # for phase
-        if self.is_phase_debate():
-            opinions = self.get_table_opinions(untapped=True)
-            if opinions:
-                raise Exception('todo')
-
-        elif self.is_phase_main():
-            # get list of available persons to play
-            if not self.has_played_person():
-                hpersons = self.get_hand_persons()
-                # skip to looking at other cards if you cannot play a person
-                if hpersons:
-                    for hperson in hpersons:
-                        moves.append(Move(Move.TYPE_PERSON, hperson))
-                    return moves
-            # otherwise look at all other cards to play
-            raise Exception('todo')
-
-        elif self.is_phase_draw():
-            moves.append(Move(Move.TYPE_DRAW))
-
-        elif self.is_phase_upkeep():
-            # not doing anything till such logic is required
-            pass
-        else:
-            raise Exception('what phase?')
-
-        return moves
-
-    def play_pass(self):
-        self.next_phase()
-        self.log(self.get_player(), Event.CMD_PASS)
-
-    def play_person(self, gcard):
-        # move from hand to table
-        player = self.get_player()
-        table_size = len(player['table'])
-        gcard['slot'] = GameCard.SLOT_TABLE
-        gcard['pos'] = table_size
-        del player['hand'][gcard['pk']]
-        player['table'][gcard['pk']] = gcard
-        self.save_gcard(gcard)
-        self.log(player, Event.CMD_PLAY, gcard)
-        # no next phase, can still play opinions
-            
-    def play_creature(self, player, gcard):
-        # todo handle spells
-        # if spell, it should be not be moved to table, but trigger
-        # ability and go to grave
-        hand_size = player.table_size()
-        gcard.slot = GameCard.SLOT_TABLE
-        gcard.pos = hand_size
-        gcard.save()
-        # trigger ability?
-        self.log(player, Event.CMD_PLAY, gcard)
-
-    def use_ability(self, player, gcard, ability):
-        assert ability in gcard.abilities
-        assert gcard.player == player
-        self.ability_cost(player, gcard, ability)
-        self.ability_benefit(player, gcard, ability)
-
-    def ability_cost(self, player, gcard, ability):
-        if ability.cost == Ability.COST_TAP:
-            gcard.tapped = True
-            gcard.save()
-            self.log(player, Event.CMD_COST, gcard, ability, comment=ability.cost)
-        else:
-            raise Exception('unknown cost {}'.format(ability.cost))
+def refresh_stale_rows(games=None):
+    """Brings the rows of the games in snapshot mode up to date, of all games if none are given"""
+    games = Game.objects.all() if games is None else games
+    refreshed = 0
+    for game in games.filter(rows_stale=True):
+        adaptor = GameAdaptor()
+        adaptor.to_dict(game)
+        adaptor.refresh_rows()
+        refreshed += 1
+    return refreshed
 
-    def ability_benefit(self, player, gcard, ability):
-        if ability.benefit == Ability.BENEFIT_M1G:
-            player.pool += 1
-            player.save()
-            self.log(player, Event.CMD_BENEFIT, gcard, comment=ability.benefit)
-        else:
-            raise Exception('unknown benefit {}'.format(ability.benefit))
 
-    def save_game(self):
-        super().save_game()
+GameHandle = namedtuple('GameHandle', ('game_id', 'player_ids'))
 
-    def save_gcard(self, gcard_data):
-        super().save_gcard(gcard_data)
 
-    def log(self, actor_pk, cmd, gcard_pk=None, error=False, comment=None):
-        Event.objects.create(
-                game_id=self.data['pk'], status=self.data['status'],
-            turn=self.data['turn'], round=self.data['round'], phase=self.data['phase'],
-            health1=self.data['players'][0]['health'], deck1_size=len(self.data['players'][0]['deck']), 
-            hand1_size=len(self.data['players'][0]['hand']), grave1_size=len(self.data['players'][0]['grave']),
-            health2=self.data['players'][1]['health'], deck2_size=len(self.data['players'][1]['deck']), 
-            hand2_size=len(self.data['players'][1]['hand']), grave2_size=len(self.data['players'][1]['grave']),
-            actor_id=actor_pk, command=cmd, gcard_id=gcard_pk, error=error, comment=comment
-        )
+def random_decklist(person_ids, opinion_ids, rng=None):
+    """Card ids of a deck of 20 random persons and 40 random opinions, bottom to top"""
+    rng = rng or random
+    return [rng.choice(person_ids) for _ in range(20)] + [rng.choice(opinion_ids) for _ in range(40)]
 
 
-class MonteCarloEngineProxy(Engine):
-
-    def save_game(self, *args, **kwargs):
-        return
-
-    def save_gcard(self, *args, **kwargs):
-        return
-
-    def log(self, *args, **kwargs):
-        return
-
-
-class Bot:
-
-    def __init__(self, engine):
-        self.tree = Tree()
-        self.tree.create_node('root', 'root', data={'edata': engine.data, 'game_over': False,
-                                                    'moves': []})
-
-    def analyze(self):
-        depth = 1
-        root = self.tree['root']
-        is_player_1 = root.data['edata']['turn'] == 1
-        best_eval = self.minimax(root, depth, is_player_1)
-        return best_eval, self._get_best_moves()
-
-    def _get_best_moves(self):
-        best_moves = None
-        max_value = float('-inf')
-        root = self.tree['root']
-        for child_id in root.fpointer:
-            child = self.tree[child_id]
-            value = child.data['value']
-            if value > max_value:
-                max_value = value
-                best_moves = child.data['moves']
-        if not best_moves:
-            raise Exception('expected best moves')
-        return best_moves
-
-    def _get_static_eval(self, final_position):
-        value = 0
-        edata = final_position.data['edata']
-        p1 = edata['players'][0]
-        p2 = edata['players'][1]
-
-        # add health
-        p1_health = p1['health']
-        p2_health = p2['health']
-        value += p1_health - p2_health
-
-        # add card counts
-        slot_scales = {
-            GameCard.SLOT_TABLE: 0.3,
-            GameCard.SLOT_HAND: 0.2,
-            GameCard.SLOT_DECK: 0.03,
-            GameCard.SLOT_GRAVE: 0.02,
-        }
-        for slot_key, scale in slot_scales.items():
-            p1_slot_cnt = len(p1[slot_key])
-            p2_slot_cnt = len(p2[slot_key])
-            value += p1_slot_cnt * scale - p2_slot_cnt * scale
-
-        # adjust eval perspective (requires prev pos to determine if maximizing player)
-        # e.g if maximizing player is p2, then flip eval
-        parent = self.tree[final_position.bpointer]
-        flip_value = 1 if parent.data['edata']['turn'] == 1 else -1
-        value *= flip_value
-
-        return round(value, 2)
-
-    def _create_node_from_moves(self, parent, moves):
-        e = MonteCarloEngineProxy(parent.data['edata'])
-        turn_at_start = e.data['turn']
-        for move in moves:
-
-            if move.is_type_pass():
-                if len(moves) != 1:
-                    raise Exception('should only be one move')
-                # handle separately
-                e.play_pass()
-                # next phase included in play_pass
-                same_player = e.data['turn'] == turn_at_start
-                data = {
-                    'edata': e.data,
-                    'moves': [move],
-                    'game_over': False,
-                    'same_player': same_player}
-                tag = 'p{}-pass'.format(turn_at_start)
-                node = self.tree.create_node(parent=parent, tag=tag, data=data)
-                return node
-
-            elif move.is_type_person():
-                if len(moves) != 1:
-                    raise Exception('should only be one move')
-                # handle separately
-                e.play_person(move.gcard)
-                # no next_phase here, only after opinions were played
-                same_player = e.data['turn'] == turn_at_start
-                data = {
-                    'edata': e.data,
-                    'moves': [move],
-                    'game_over': False,
-                    'same_player': same_player}
-                tag = 'p{}-person'.format(turn_at_start)
-                node = self.tree.create_node(parent=parent, tag=tag, data=data)
-                return node
-
-            elif move.is_type_draw():
-                if len(moves) != 1:
-                    raise Exception('should only be one move')
-                e.draw(e.get_player(), 1)
-                e.next_phase()
-                # can be next player if unable to play any hand card, and nothing on table
-                same_player = e.data['turn'] == turn_at_start
-                node = self.tree.create_node(parent=parent, data={'edata': e.data, 'moves': [move], 'game_over': False,
-                                                                  'same_player': same_player})
-                return node
+def card_ids(cards):
+    return [getattr(card, 'pk', card) for card in cards]
 
-            else:
-                raise Exception('what type_ {}?'.format(move.type_))
-        raise Exception('expected moves...')
-
-    def _add_children(self, parent):
-        e = MonteCarloEngineProxy(parent.data['edata'])
-        nodes = []
-
-        # pass
-        if e.is_action_phase():
-            pass_move = Move(Move.TYPE_PASS)
-            node = self._create_node_from_moves(parent, [pass_move])
-            nodes.append(node)
-
-        # get all moves
-        moves = e.get_available_moves()
-        if not moves:
-            return nodes
-
-        # make all possible combinations
-
-        # persons
-        # add each person as a node, no combinations
-        if moves[0].is_type_person():
-            for move in moves:
-                node = self._create_node_from_moves(parent, [move])
-                nodes.append(node)
-
-        # draw
-        # there can only be 1 draw for active player
-        elif moves[0].is_type_draw():
-            node = self._create_node_from_moves(parent, moves)
-            nodes.append(node)
 
-        else:
-            raise Exception('todo move type')
-        return nodes
-
-    def minimax(self, position, depth, is_player_1):
-        pdata = position.data
-        pmoves = pdata['moves']
-        if depth <= 0 or pdata.get('game_over'):
-            return self._get_static_eval(position)
-
-        pround = pdata['edata']['round']
-        pturn = pdata['edata']['turn']
-        pphase = pdata['edata']['phase']
-
-        children = self._add_children(position)
-        self.tree.show()
-
-        if is_player_1:
-            value = -float('inf')
-            for child in children:
-                cdata = child.data
-                cmoves = cdata['moves']
-
-                cround = cdata['edata']['round']
-                cturn = cdata['edata']['turn']
-                cphase = cdata['edata']['phase']
-                next_is_player_1 = is_player_1 if cdata['same_player'] else not is_player_1
-
-                pos_value = self.minimax(child, depth - 1, next_is_player_1)
-                cdata['value'] = pos_value
-                value = max(value, pos_value)
-
-        else:  # player 2
-            value = float('inf')
-            for child in children:
-                cdata = child.data
-                cmoves = cdata['moves']
-
-                cround = cdata['edata']['round']
-                cturn = cdata['edata']['turn']
-                cphase = cdata['edata']['phase']
-                next_is_player_1 = is_player_1 if cdata['same_player'] else not is_player_1
-                pos_value = self.minimax(child, depth - 1, next_is_player_1)
-                cdata['value'] = pos_value
-                value = min(value, pos_value)
-
-        return value
-
-    def play(self):
-        func = getattr(self, 'play_{}'.format(self.engine.game.phase))
-        func()
-
-    def play_main(self):
-        p = self.engine.active_player
-        # play land
-        for gcard in p.hand() and gcard.is_affordable():
-            if gcard.card.is_person():
-                self.engine.play_land(p, gcard)
-                break
-        # play creature
-        for gcard in p.hand():
-            if gcard.card.is_creature() and gcard.is_affordable():
-                self.pay(p, gcard)
-
-    def pay(self, p, gcard):
-        while p.pool < gcard.card.mana:
-            # for every land see if you can tap it
-            land = p.get_any_untapped_persons()
-            self.engine.use_ability(p, land, land.abilities.get())
-
-
-# def minimax(position, depth, alpha, beta, maximizingPlayer):
-#     if depth == 0 or game_over in position:
-#         return static evaluation of position
-#
-#     if maximizingPlayer:
-#         maxEval = -infinity
-#         for each child of position
-#             eval = minimax(child, depth - 1, alpha, beta false)
-#             maxEval = max(maxEval, eval)
-#             alpha = max(alpha, eval)
-#             if beta <= alpha
-#                 break
-#         return maxEval
-#
-#     else
-#         minEval = +infinity
-#         for each child of position
-#             eval = minimax(child, depth - 1, alpha, beta true)
-#             minEval = min(minEval, eval)
-#             beta = min(beta, eval)
-#             if beta <= alpha
-#                 break
-#             return minEval
+def deck_gcards(player_id, decklist):
+    return [GameCard(player_id=player_id, card_id=card_id, pos=pos, slot=GameCard.SLOT_DECK)
+            for pos, card_id in enumerate(decklist, 1)]
 
 
 def create_random_deck(player, persons, opinions):
-    # add 20 persons
-    for p in range(20):
-        random_person = choice(persons)
-        GameCard.objects.create(player=player, card=random_person, pos=(p + 1),
-                                slot=GameCard.SLOT_DECK)
-
-    # add 40 opinions
-    for o in range(40):
-        random_opinion = choice(opinions)
-        n = 20 + o
-        GameCard.objects.create(player=player, card=random_opinion, pos=n,
-                                slot=GameCard.SLOT_DECK)
-
-    return player.gamecard_set.all()
+    decklist = random_decklist(card_ids(persons), card_ids(opinions))
+    return GameCard.objects.bulk_create(deck_gcards(player.pk, decklist))
 
 
 def create_random_game(persons, opinions):
-    # game
-    game = Game.objects.create()
-    # players
-    player1 = game.player_set.create()
-    player2 = game.player_set.create()
-    # decks
-    deck1 = create_random_deck(player1, persons, opinions)
-    deck2 = create_random_deck(player2, persons, opinions)
+    with transaction.atomic():
+        # game
+        game = Game.objects.create()
+        # players
+        player1 = game.player_set.create()
+        player2 = game.player_set.create()
+        # decks
+        create_random_deck(player1, persons, opinions)
+        create_random_deck(player2, persons, opinions)
     # done
     return game
+
+
+def create_random_games(count, persons=(), opinions=(), rng=None, decklists=None):
+    """Creates the games with their players and decks in one transaction with a few bulk
+    inserts. The decks are random, drawn with 'rng' from the persons and opinions (cards or
+    card ids), or the card ids of 'decklists', one decklist per player. Returns a handle per
+    game with the game and player ids."""
+    rng = rng or random.Random()
+    person_ids = card_ids(persons)
+    opinion_ids = card_ids(opinions)
+    with transaction.atomic():
+        games = Game.objects.bulk_create([Game() for _ in range(count)])
+        players = Player.objects.bulk_create([Player(game_id=game.pk) for game in games for _ in range(2)])
+        gcards = []
+        for i, player in enumerate(players):
+            decklist = decklists[i % 2] if decklists else random_decklist(person_ids, opinion_ids, rng)
+            gcards.extend(deck_gcards(player.pk, decklist))
+        GameCard.objects.bulk_create(gcards, batch_size=1000)
+    return [GameHandle(game.pk, (players[2 * i].pk, players[2 * i + 1].pk)) for i, game in enumerate(games)]
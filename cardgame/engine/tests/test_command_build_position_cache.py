@@ -0,0 +1,27 @@
+import pytest
+
+from cards.services import create_standard_cards
+from core.cache import PositionCache
+from engine.management.commands.build_position_cache import Command
+from engine.management.commands.simulate import Command as SimulateCommand
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cards_created():
+    create_standard_cards()
+
+
+class TestBuildPositionCacheCommand:
+
+    def test_build(self, cards_created, tmp_path, capsys):
+        path = str(tmp_path / 'positions.sqlite3')
+        cmd = Command()
+        cmd.handle(path=path, games=2, workers=1, seed=1, depth=2, max_rounds=3)
+        with PositionCache(path, readonly=True) as position_cache:
+            assert len(position_cache) > 0
+
+        cmd = SimulateCommand()
+        cmd.handle(games=2, workers=1, seed=1, depth=2, max_rounds=3, position_cache=path)
+        assert 'Position cache hit rate' in capsys.readouterr().out
@@ -0,0 +1,33 @@
+import pytest
+
+from cards.services import create_standard_cards
+from engine.management.commands.explain_queries import Command, full_scans
+from engine.models import Game, GameCard
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cards_created():
+    create_standard_cards()
+
+
+def test_full_scans():
+    assert full_scans('3 0 0 SCAN engine_gamecard\n') == ['engine_gamecard']
+    assert full_scans('2 0 0 SCAN TABLE engine_game') == ['engine_game']
+    assert full_scans('Seq Scan on engine_event  (cost=0.00..35.50 rows=10 width=4)') == ['engine_event']
+    assert full_scans('3 0 0 SEARCH engine_gamecard USING INDEX gamecard_player_slot_pos (player_id=? AND slot=?)\n'
+                      '5 0 0 SCAN engine_game USING INDEX game_unfinished') == []
+
+
+class TestExplainQueriesCommand:
+
+    def test_explain(self, cards_created, capsys):
+        cmd = Command()
+        cmd.handle(gamecards=2400, seed=1)
+        out = capsys.readouterr().out
+        assert 'No full table scans' in out
+        assert 'Player.available_support' in out
+        # rolled back
+        assert Game.objects.count() == 0
+        assert GameCard.objects.count() == 0
@@ -1,12 +1,41 @@
+import json
+
 import pytest
 
+from cards.services import create_standard_cards
 from engine.management.commands.simulate import Command
+from engine.models import GameResult
 
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture
+def cards_created():
+    create_standard_cards()
+
+
 class TestSimulateCommand:
 
-    def test_default(self):
+    def test_default(self, cards_created):
         cmd = Command()
         cmd.handle()
+
+    def test_self_play(self, cards_created):
+        cmd = Command()
+        cmd.handle(games=3, workers=1, seed=1, max_rounds=3, log_sample=1.0)
+        results = list(GameResult.objects.order_by('pk'))
+        assert len(results) == 3
+        for result in results:
+            assert result.rounds == 3
+            assert result.moves > 0
+            assert json.loads(result.events)
+
+    def test_self_play_workers_match(self, cards_created):
+        cmd = Command()
+        cmd.handle(games=4, workers=1, seed=2, max_rounds=2)
+        cmd.handle(games=4, workers=2, seed=2, max_rounds=2)
+        serial, parallel = [
+            [(result.seed, result.moves, result.winner) for result in results]
+            for results in (GameResult.objects.order_by('pk')[:4], GameResult.objects.order_by('pk')[4:])
+        ]
+        assert serial == parallel
@@ -1,17 +1,32 @@
+import time
 from copy import deepcopy
-from random import choice
+from random import Random, choice, seed
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from cards.models import Card
 from cards.services import create_standard_cards
-from engine.models import Game, GameCard
-from engine.services import create_random_deck, create_random_game, GameAdaptor, Engine, Bot
+from engine.models import Event, Game, GameCard, GameSnapshot, Player
+from core import catalog, snapshot
+from core import events as core_events
+from core.batch import static_eval
+from core.bot import (
+    Bot, BotSession, SearchNode, TranspositionTable, heavy_rollout_policy, moves_key, order_by_search_value,
+    order_by_static_eval)
+from core.engine import MonteCarloEngineProxy, Move
+from engine.services import (
+    create_random_deck, create_random_game, create_random_games, iter_wide_events, refresh_stale_rows, GameAdaptor,
+    GameReplay, Engine)
 
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture
+def seeded_random():
+    seed(7)
+
+
 @pytest.fixture
 def cards_created():
     create_standard_cards()
@@ -40,6 +55,46 @@ def test_create_random_deck(persons_and_opinions):
     assert len(res) == 60
 
 
+def test_create_random_games(persons_and_opinions, django_assert_max_num_queries):
+    persons, opinions = [list(cards.values_list('pk', flat=True)) for cards in persons_and_opinions]
+    # games, players and game cards in a savepoint, sqlite inserts 199 game cards per query
+    with django_assert_max_num_queries(11):
+        handles = create_random_games(10, persons, opinions, Random(1))
+    assert len(handles) == 10
+    for handle in handles:
+        assert list(Player.objects.filter(game_id=handle.game_id).values_list('pk', flat=True)) == list(
+            handle.player_ids)
+        for player_id in handle.player_ids:
+            positions = GameCard.objects.filter(player_id=player_id).values_list('pos', flat=True)
+            assert list(positions) == list(range(1, 61))
+
+    def decklists(handle):
+        return [list(GameCard.objects.filter(player_id=player_id).values_list('card_id', flat=True))
+                for player_id in handle.player_ids]
+    again = create_random_games(10, persons, opinions, Random(1))
+    assert [decklists(handle) for handle in again] == [decklists(handle) for handle in handles]
+
+
+def test_create_random_games_cards(persons_and_opinions):
+    persons, opinions = persons_and_opinions
+    handles = create_random_games(2, persons, opinions, Random(1))
+    person_ids = set(persons.values_list('pk', flat=True))
+    for handle in handles:
+        for player_id in handle.player_ids:
+            card_ids = list(GameCard.objects.filter(player_id=player_id).values_list('card_id', flat=True))
+            assert len(card_ids) == 60
+            assert set(card_ids[:20]) <= person_ids
+
+
+def test_create_random_games_decklists(persons_and_opinions):
+    persons, opinions = persons_and_opinions
+    fixed = [[persons[0].pk] * 20 + [opinions[0].pk] * 40, [opinions[1].pk] * 60]
+    handle, = create_random_games(1, decklists=fixed)
+    engine = Engine(Game.objects.get(pk=handle.game_id))
+    for player, decklist in zip(engine.data['players'], fixed):
+        assert [gcard['card_id'] for gcard in player['deck'].values()] == decklist
+
+
 @pytest.fixture
 def example_game(persons_and_opinions):
     # game
@@ -80,6 +135,24 @@ class TestGameAdaptor:
         adaptor.to_dict(example_game)
         assert adaptor.is_status_setup()
 
+    def test_to_dict_queries(self, example_game, django_assert_num_queries):
+        adaptor = GameAdaptor()
+        # players, game cards, and the cards and their abilities missing from the catalog
+        with django_assert_num_queries(4):
+            adaptor.to_dict(example_game)
+        with django_assert_num_queries(2):
+            GameAdaptor().to_dict(example_game)
+        for player, db_player in zip(adaptor.data['players'], example_game.player_set.order_by('pk')):
+            assert player['pk'] == db_player.pk
+            assert len(player['deck']) == 60
+            positions = [gcard['pos'] for gcard in player['deck'].values()]
+            assert positions == sorted(positions)
+            for gcard in db_player.gamecard_set.all():
+                assert player['deck'][gcard.pk]['card_id'] == gcard.card_id
+                card = catalog.get(gcard.card_id)
+                assert card.power == gcard.card.power
+                assert card.abilities == tuple((a.cost, a.benefit) for a in gcard.card.abilities.all())
+
 
 class TestEngine:
 
@@ -99,14 +172,499 @@ class TestEngine:
         engine.shuffle_deck(engine.data['players'][0])
         assert original_deck != engine.data['players'][0]['deck']
 
+    def test_setup_game_flushes(self, example_game):
+        engine = Engine(example_game)
+        engine.setup_game()
+        assert not engine.is_dirty()
+        example_game.refresh_from_db()
+        assert example_game.status == Game.STATUS_BUSY
+        for player in example_game.player_set.all():
+            assert player.hand_size() == Game.START_DRAW_NUMBER
+            assert player.deck_size() == 60 - Game.START_DRAW_NUMBER
+
+    def test_flush(self, example_game, django_assert_num_queries):
+        engine = Engine(example_game)
+        player = engine.data['players'][0]
+        engine.shuffle_deck(player)
+        engine.data['phase'] = Game.PHASE_MAIN
+        engine.save_game()
+        assert engine.is_dirty()
+        # savepoint, game update, game cards update, events insert, snapshot insert after the shuffle, release
+        with django_assert_num_queries(6):
+            engine.flush()
+        assert not engine.is_dirty()
+        example_game.refresh_from_db()
+        assert example_game.phase == Game.PHASE_MAIN
+        for gcard in GameCard.objects.filter(pk__in=player['deck']):
+            assert gcard.pos == player['deck'][gcard.pk]['pos']
+
+    def test_snapshot_mode(self, example_game, django_assert_num_queries):
+        engine = Engine(example_game, snapshot=True)
+        engine.setup_game()
+        player = engine.data['players'][0]
+        engine.shuffle_deck(player)
+        # savepoint, game update, events insert, snapshot insert after the shuffle, release
+        with django_assert_num_queries(5):
+            engine.flush()
+        example_game.refresh_from_db()
+        assert example_game.status == Game.STATUS_BUSY
+        assert example_game.rows_stale
+        # the rows are not written
+        assert GameCard.objects.filter(player__game=example_game, slot=GameCard.SLOT_HAND).count() == 0
+
+        with django_assert_num_queries(0):
+            loaded = Engine(example_game)
+        assert loaded.snapshot_mode
+        assert loaded.data == engine.data
+        assert loaded.hash == engine.hash
+
+    def test_refresh_rows(self, example_game):
+        with Engine(example_game, snapshot=True) as engine:
+            engine.setup_game()
+        assert refresh_stale_rows() == 1
+        assert refresh_stale_rows() == 0
+        example_game.refresh_from_db()
+        assert not example_game.rows_stale
+
+        # loaded from the rows
+        game = Game.objects.get(pk=example_game.pk)
+        game.snapshot = None
+        adaptor = GameAdaptor()
+        adaptor.to_dict(game)
+        assert adaptor.data == engine.data
+
+    def test_log_buffered(self, example_game):
+        engine = Engine(example_game)
+        engine.shuffle_deck(engine.data['players'][0])
+        engine.draw(engine.data['players'][0], 2)
+        assert Event.objects.filter(game=example_game).count() == 0
+        engine.flush()
+        events = Event.objects.filter(game=example_game).order_by('seq')
+        assert [(event.seq, event.command) for event in events] == [
+            (1, Event.CMD_SHUFFLE), (2, Event.CMD_DRAW), (3, Event.CMD_DRAW)]
+
+    def test_log_buffer_size(self, example_game):
+        engine = Engine(example_game)
+        engine.EVENT_BUFFER_SIZE = 3
+        engine.draw(engine.data['players'][0], 4)
+        assert Event.objects.filter(game=example_game).count() == 3
+        assert engine.is_dirty()
+
+    def test_events_compact(self, example_game):
+        with Engine(example_game) as engine:
+            engine.draw(engine.data['players'][0], 2)
+        first, second = Event.objects.filter(game=example_game).order_by('seq')
+        # the first event of an engine has the whole board, then only the changes
+        assert len(first.delta) == len(core_events.BOARD_FIELDS) * core_events.PAIR.size
+        assert len(second.delta) == 2 * core_events.PAIR.size
+
+        # a later engine continues the sequence
+        game = Game.objects.get(pk=example_game.pk)
+        with Engine(game) as engine:
+            engine.draw(engine.data['players'][0], 1)
+            board = engine.get_board()
+        events = list(iter_wide_events(game))
+        assert [event['seq'] for event in events] == [1, 2, 3]
+        assert {field: events[-1][field] for field in board} == board
+        assert events[-1]['command'] == Event.CMD_DRAW
+        assert events[-1]['occurred_at'] is not None
+        assert [event['seq'] for event in iter_wide_events(game, start=1, stop=2)] == [2]
+
+    def test_context_manager_flushes(self, example_game):
+        with Engine(example_game) as engine:
+            engine.shuffle_deck(engine.data['players'][0])
+        assert not engine.is_dirty()
+        assert Event.objects.filter(game=example_game, code=Event.CMD_CODES[Event.CMD_SHUFFLE]).count() == 1
+
+
+    def test_apply_and_undo_move(self, seeded_random, set_up_engine):
+        engine = MonteCarloEngineProxy(set_up_engine.data)
+        original = deepcopy(engine.data)
+
+        def zone_orders():
+            return [list(player[slot]) for player in engine.data['players'] for slot in engine.SLOTS]
+        original_zone_orders = zone_orders()
+
+        undos = [engine.apply_move(Move(Move.TYPE_DRAW))]
+        assert engine.is_phase_main()
+        # a person from the middle of the hand
+        hperson = engine.get_hand_persons()[0]
+        assert list(engine.get_player()['hand'])[-1] != hperson['pk']
+        undos.append(engine.apply_move(Move(Move.TYPE_PERSON, hperson)))
+        assert hperson['pk'] in engine.get_player()['table']
+        undos.append(engine.apply_move(Move(Move.TYPE_PASS)))
+        assert engine.data != original
+
+        assert engine.hash == engine.compute_hash()
+
+        for undo in reversed(undos):
+            engine.undo_move(undo)
+        assert engine.data == original
+        assert engine.hash == engine.compute_hash()
+        assert zone_orders() == original_zone_orders
+        for player in engine.data['players']:
+            for slot in engine.SLOTS:
+                positions = [gcard['pos'] for gcard in player[slot].values()]
+                assert positions == sorted(positions)
+
+    def test_available_moves_unique(self, seeded_random, set_up_engine):
+        engine = MonteCarloEngineProxy(set_up_engine.data)
+        player = engine.get_player()
+        # the standard cards have a single person card, with persons in hand the draw leads
+        # to the main phase
+        for gcard in [gc for gc in player['deck'].values() if engine.get_card(gc).kind == Card.KIND_PERSON][:2]:
+            engine.move_gcard(player, gcard, GameCard.SLOT_HAND, len(player['hand']))
+        engine.apply_move(Move(Move.TYPE_DRAW))
+        assert engine.is_phase_main()
+        hpersons = engine.get_hand_persons()
+        assert len(hpersons) > 1
+        moves = engine.get_available_moves()
+        assert len(moves) == 1
+        assert moves[0].gcard is hpersons[0]
+
+
+class StateRecordingEngine(Engine):
+    """Engine that keeps a copy of the state after every event"""
+    SNAPSHOT_INTERVAL = 5
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.states = []
+
+    def log(self, *args, **kwargs):
+        super().log(*args, **kwargs)
+        self.states.append(snapshot.loads(snapshot.dumps(self.data)))
+
+
+class TestGameReplay:
+
+    @pytest.fixture
+    def played_engine(self, seeded_random, example_game):
+        with StateRecordingEngine(example_game) as engine:
+            engine.setup_game()
+            for _ in range(20):
+                engine.apply_move(Move(Move.TYPE_PASS) if engine.is_action_phase() else Move(Move.TYPE_DRAW))
+        return engine
+
+    def test_snapshots(self, example_game, played_engine):
+        numbers = list(GameSnapshot.objects.filter(game=example_game).values_list('event_number', flat=True))
+        commands = [event['command'] for event in iter_wide_events(example_game)]
+        assert len(commands) == len(played_engine.states)
+        assert sorted(numbers) == [
+            n for n, command in enumerate(commands, 1) if command == Event.CMD_SHUFFLE or n % 5 == 0]
+
+    def test_state_at(self, example_game, played_engine, django_assert_max_num_queries):
+        game_replay = GameReplay(example_game)
+        assert len(game_replay) == len(played_engine.states)
+        for number in (2, 5, 13, len(played_engine.states)):
+            # snapshot, events
+            with django_assert_max_num_queries(2):
+                engine = game_replay.state_at(number)
+            assert engine.data == played_engine.states[number - 1]
+        with pytest.raises(Exception):
+            game_replay.state_at(0)
+
+    def test_iter_states(self, example_game, played_engine):
+        states = list(GameReplay(example_game).iter_states())
+        start = states[0][0]
+        assert [number for number, _ in states] == list(range(start, len(played_engine.states) + 1))
+        # the engine is updated in place
+        assert all(engine is states[0][1] for _, engine in states)
+        for number, engine in GameReplay(example_game).iter_states(start=7, stop=12):
+            assert engine.data == played_engine.states[number - 1]
+        assert number == 12
+
 
+class TestTranspositionTable:
 
+    def test_get_put(self):
+        tt = TranspositionTable(8)
+        assert tt.get(3) is None
+        tt.put(3, 1.5, 2, TranspositionTable.BOUND_EXACT)
+        assert tt.get(3) == (1.5, 2, TranspositionTable.BOUND_EXACT)
+        assert tt.stats == {'hits': 1, 'misses': 1, 'evictions': 0}
+
+    def test_best_moves(self, set_up_engine):
+        tt = TranspositionTable(8)
+        tt.put(3, 1.5, 2, TranspositionTable.BOUND_EXACT, best=(('draw', None),))
+        assert tt.best_moves(3) == (('draw', None),)
+        assert tt.best_moves(11) is None
+
+        # the best moves of the position are searched first
+        bot = Bot(set_up_engine)
+        bot.engine.apply_move(Move(Move.TYPE_DRAW))
+        moves_list = bot._get_moves()
+        passing = next(moves for moves in moves_list if moves[0].is_type_pass())
+        assert order_by_static_eval(bot, moves_list, True)[0] is not passing
+        bot.tt.put(bot.engine.hash, 0, 1, TranspositionTable.BOUND_EXACT, best=moves_key(passing))
+        assert order_by_search_value(bot, moves_list, True)[0] is passing
+
+    def test_replacement(self):
+        tt = TranspositionTable(8)
+        tt.put(3, 1.5, 2, TranspositionTable.BOUND_EXACT)
+        # shallower search of same generation does not replace
+        tt.put(11, 0.5, 1, TranspositionTable.BOUND_EXACT)
+        assert tt.get(11) is None
+        # deeper search does
+        tt.put(11, 0.5, 3, TranspositionTable.BOUND_LOWER)
+        assert tt.get(11) == (0.5, 3, TranspositionTable.BOUND_LOWER)
+        assert tt.stats['evictions'] == 1
+        # any search replaces entries of older generations
+        tt.new_search()
+        tt.put(19, 0.1, 1, TranspositionTable.BOUND_UPPER)
+        assert tt.get(19) == (0.1, 1, TranspositionTable.BOUND_UPPER)
+        assert len(tt) == 1
+
+
+def minimax_value(bot, position, depth, is_player_1):
+    """Plain minimax for comparing against the pruned search"""
+    if depth <= 0:
+        return bot._get_static_eval()
+    values = []
+    for child in bot._add_children(position):
+        undos = bot._apply_node(child)
+        next_is_player_1 = is_player_1 if child.same_player else not is_player_1
+        values.append(minimax_value(bot, child, depth - 1, next_is_player_1))
+        bot._undo_node(undos)
+    return max(values) if is_player_1 else min(values)
 
 
 class TestBot:
 
+    def test_analyze_keeps_engine(self, set_up_engine):
+        original = deepcopy(set_up_engine.data)
+        bot = Bot(set_up_engine)
+        bot.analyze()
+        assert set_up_engine.data == original
+        assert bot.engine.data == original
+
     def test_analyze(self, set_up_engine):
         bot = Bot(set_up_engine)
         best_value, best_moves = bot.analyze()
         assert best_value > 0
         assert len(best_moves)
+
+    def test_export_tree(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.analyze()
+        tree = bot.export_tree()
+        assert tree.size() == 1 + len(bot.root.children)
+        assert tree[tree.root].tag == 'root'
+
+    def test_analyze_alpha_beta(self, seeded_random, set_up_engine):
+        depth = 6
+        plain_bot = Bot(set_up_engine)
+        expected = minimax_value(plain_bot, plain_bot.root, depth, True)
+
+        bot = Bot(set_up_engine)
+        best_value, best_moves = bot.analyze(depth)
+        assert best_value == expected
+        assert best_moves[0].is_type_draw()
+        assert bot.stats['pruned'] > 0
+
+        unordered_bot = Bot(set_up_engine, move_ordering=None)
+        assert unordered_bot.analyze(depth)[0] == expected
+
+    def test_analyze_transpositions(self, seeded_random, set_up_engine):
+        depth = 6
+        engine = MonteCarloEngineProxy(set_up_engine.data)
+        player = engine.get_player()
+        # the standard cards have a single person card, one of the persons becomes another card
+        persons = [gc for gc in player['deck'].values() if engine.get_card(gc).kind == Card.KIND_PERSON][:2]
+        other, = catalog.register([engine.get_card(persons[1])._replace(pk=persons[1]['card_id'] + 1000)])
+        persons[1]['card_id'] = other.pk
+        for gcard in persons:
+            engine.move_gcard(player, gcard, GameCard.SLOT_HAND, len(player['hand']))
+        engine.hash = engine.compute_hash()
+        plain_bot = Bot(engine)
+        expected = minimax_value(plain_bot, plain_bot.root, depth, True)
+
+        bot = Bot(engine, move_ordering=None)
+        assert bot.analyze(depth)[0] == expected
+        # persons in hand played in either order
+        assert bot.tt.stats['hits'] > 0
+        hits = bot.tt.stats['hits']
+        # a new search reuses the entries of the previous one
+        bot.root = SearchNode(None, [])
+        assert bot.analyze(depth)[0] == expected
+        assert bot.tt.stats['hits'] > hits
+        assert bot.engine.hash == bot.engine.compute_hash()
+
+    def test_analyze_iterative_deepening(self, seeded_random, set_up_engine):
+        expected_value, expected_moves = Bot(set_up_engine).analyze(5)
+        bot = Bot(set_up_engine)
+        best_value, best_moves = bot.analyze(max_depth=5)
+        assert bot.stats['depth'] == 5
+        assert best_value == expected_value
+        assert moves_key(best_moves) == moves_key(expected_moves)
+
+    def test_analyze_max_depth_below_one(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        with pytest.raises(Exception, match='max depth'):
+            bot.analyze(max_depth=0)
+        with pytest.raises(Exception, match='max depth'):
+            bot.analyze(time_budget=1, max_depth=0)
+
+    def test_analyze_time_budget(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        best_value, best_moves = bot.analyze(time_budget=0.05)
+        assert bot.stats['depth'] >= 1
+        assert best_moves[0].is_type_draw()
+        # the search that ran out of time is undone
+        assert bot.engine.data == set_up_engine.data
+        assert bot.engine.hash == bot.engine.compute_hash()
+
+        bot = Bot(set_up_engine)
+        bot.analyze(time_budget=0)
+        assert bot.stats['depth'] == 1
+
+    def test_advance(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.analyze_mcts(iterations=50, rng=Random(1))
+        child = max(bot.root.children, key=lambda child: child.visits)
+        bot.advance(child.moves)
+        assert bot.root is child
+        assert bot.root.is_root()
+        bot.analyze_mcts(iterations=10, rng=Random(1))
+        assert bot.root.visits == child.visits
+
+        engine = MonteCarloEngineProxy(set_up_engine.data)
+        for move in child.moves:
+            engine.apply_move(move)
+        assert bot.engine.data == engine.data
+
+    def test_advance_interchangeable(self, seeded_random, set_up_engine):
+        bot = Bot(set_up_engine)
+        engine = bot.engine
+        player = engine.get_player()
+        for gcard in [gc for gc in player['deck'].values() if engine.get_card(gc).kind == Card.KIND_PERSON][:2]:
+            engine.move_gcard(player, gcard, GameCard.SLOT_HAND, len(player['hand']))
+        engine.apply_move(Move(Move.TYPE_DRAW))
+        bot.analyze_mcts(iterations=50, rng=Random(1))
+        hpersons = engine.get_hand_persons()
+        child = next(child for child in bot.root.children if not child.moves[0].is_type_pass())
+        assert child.moves[0].gcard is hpersons[0]
+        # the other person of the hand is the same card
+        bot.advance([Move(Move.TYPE_PERSON, deepcopy(hpersons[1]))])
+        assert bot.root is child
+        bot.analyze_mcts(iterations=50, rng=Random(1))
+        assert bot.engine.hash == bot.engine.compute_hash()
+
+    def test_session_ponder_mcts(self, set_up_engine):
+        mcts_kwargs = {'rng': Random(1)}
+        with BotSession(set_up_engine, mode='mcts', ponder=True, mcts_kwargs=mcts_kwargs) as session:
+            _, moves = session.analyze(iterations=20)
+            session.play(moves)
+            time.sleep(0.05)
+            session.stop_pondering()
+            # pondered on the position of the opponent
+            assert session.bot.root.visits > 0
+            assert session.bot.engine.hash == session.bot.engine.compute_hash()
+
+    def test_session_ponder_minimax(self, set_up_engine):
+        with BotSession(set_up_engine, ponder=True) as session:
+            _, moves = session.analyze(depth=2)
+            session.play(moves)
+            time.sleep(0.05)
+            session.stop_pondering()
+            # searched deeper than asked for
+            assert max(entry[2] for entry in session.bot.tt.entries if entry) > 2
+            engine = MonteCarloEngineProxy(set_up_engine.data)
+            for move in moves:
+                engine.apply_move(move)
+            assert session.bot.engine.data == engine.data
+            assert session.bot.engine.hash == engine.hash
+            assert session.analyze(depth=2)[1]
+
+    @pytest.mark.parametrize('move_ordering', [order_by_search_value, order_by_static_eval])
+    def test_analyze_lazy_children(self, seeded_random, set_up_engine, move_ordering):
+        bot = Bot(set_up_engine, move_ordering=move_ordering)
+        applied = []
+        apply_move = bot.engine.apply_move
+
+        def counting_apply_move(move):
+            applied.append(move)
+            return apply_move(move)
+        bot.engine.apply_move = counting_apply_move
+        bot.analyze(8)
+        assert bot.stats['pruned'] > 0
+        # pruned siblings are never built nor played, the ordering plays no moves
+        built = []
+        nodes = [bot.root]
+        while nodes:
+            node = nodes.pop()
+            built.append(node)
+            nodes.extend(node.children)
+        assert len(built) == bot.stats['nodes']
+        assert len(applied) == sum(len(node.moves) for node in built)
+
+    def test_static_evals(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        positions = []
+        values = []
+        for child in bot._add_children(bot.root):
+            undos = bot._apply_node(child)
+            positions.append(bot._get_position())
+            values.append(bot._get_static_eval())
+            bot._undo_node(undos)
+        assert list(static_eval(*zip(*positions))) == values
+
+    def test_analyze_mcts(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        best_value, best_moves = bot.analyze_mcts(iterations=50, rng=Random(1))
+        assert isinstance(best_value, float)
+        assert best_moves[0].is_type_draw()
+        assert bot.stats['iterations'] == 50
+        assert bot.root.visits == 50
+        assert bot.engine.data == set_up_engine.data
+        assert bot.engine.hash == bot.engine.compute_hash()
+
+    def test_analyze_mcts_after_minimax(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.analyze(2)
+        minimax_children = bot.root.children
+        bot.analyze_mcts(iterations=20, rng=Random(1))
+        assert not set(bot.root.children) & set(minimax_children)
+        assert len(bot.root.children) == len(bot._get_moves())
+        assert bot.root.visits == 20
+        # the Monte Carlo tree grows on
+        bot.analyze_mcts(iterations=10, rng=Random(1))
+        assert bot.root.visits == 30
+
+    def test_analyze_mcts_heavy_playouts(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.engine.apply_move(Move(Move.TYPE_DRAW))
+        best_value, best_moves = bot.analyze_mcts(iterations=30, rollout_policy=heavy_rollout_policy,
+                                                  rng=Random(1))
+        assert len(best_moves) == 1
+        assert sum(child.visits for child in bot.root.children) == 30
+
+    def test_analyze_mcts_time_budget(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.analyze_mcts(iterations=None, time_budget=0.05)
+        assert bot.stats['iterations'] > 0
+        with pytest.raises(Exception):
+            bot.analyze_mcts(iterations=None)
+
+    def test_analyze_parallel(self, seeded_random, set_up_engine):
+        bot = Bot(set_up_engine)
+        bot.engine.apply_move(Move(Move.TYPE_DRAW))
+        expected_value, expected_moves = Bot(bot.engine).analyze(4)
+
+        best_value, best_moves = bot.analyze_parallel(workers=2, depth=4)
+        assert best_value == expected_value
+        assert moves_key(best_moves) == moves_key(expected_moves)
+
+    def test_analyze_parallel_mcts(self, set_up_engine):
+        bot = Bot(set_up_engine)
+        best_value, best_moves = bot.analyze_parallel(workers=2, mode='mcts', seed=1, iterations=20)
+        assert best_moves[0].is_type_draw()
+        assert bot.root.children[0].visits == 40
+
+    @pytest.mark.parametrize('mode', ['minimax', 'mcts'])
+    def test_analyze_parallel_game_over(self, set_up_engine, mode):
+        bot = Bot(set_up_engine)
+        bot.engine.next_status()
+        assert bot.engine.is_status_finished()
+        with pytest.raises(Exception, match='expected best moves'):
+            bot.analyze_parallel(workers=2, mode=mode, iterations=20)